@@ -1,3 +1,6 @@
+from array import array
+from itertools import product
+
 
 class BayesNet:
     def __init__(self):
@@ -41,6 +44,49 @@ class BayesNet:
                 return v
         print("None found")
 
+    def compile(self):
+        """
+        Freezes the Bayes Net into a CompiledBayesNet for the inference routines
+
+        Parameters:
+        None
+
+        Returns:
+        CompiledBayesNet
+        """
+        nodes = {v.name: v for v in self.variables}
+        order, placed = [], set()
+        #parents first; add() already keeps that order, so this is normally a single pass
+        pending = list(self.variable_names)
+        while pending:
+            left = []
+            for name in pending:
+                if all(p in placed for p in nodes[name].parents or ()):
+                    placed.add(name)
+                    order.append(name)
+                else:
+                    left.append(name)
+            if len(left) == len(pending):
+                raise ValueError("Bayes Net has a cycle or a missing parent at {}".format(left[0]))
+            pending = left
+        ids = {name: i for i, name in enumerate(order)}
+        parent_offsets, parent_index = array('l', [0]), array('l')
+        cpt_offsets, cpt = array('l', [0]), array('d')
+        for name in order:
+            node = nodes[name]
+            parents = node.parents or ()
+            parent_index.extend(ids[p] for p in parents)
+            parent_offsets.append(len(parent_index))
+            for key in product((True, False), repeat=len(parents)):
+                if not parents:
+                    cpt.append(node.values[''])
+                elif len(parents) == 1:
+                    cpt.append(node.values[key[0]])
+                else:
+                    cpt.append(node.values[key])
+            cpt_offsets.append(len(cpt))
+        return CompiledBayesNet(order, parent_offsets, parent_index, cpt_offsets, cpt)
+
 class BayesNode:
     def __init__(self, name, parents, values):
         self.name = name
@@ -79,3 +125,71 @@ class BayesNode:
         else:
             return 1-v
 
+
+
+class CompiledBayesNet:
+    """
+    A BayesNet frozen for inference: variables are numbered 0..N-1 in topological order,
+    ids maps a name to its number and names maps it back. The parents of variable i are
+    parent_index[parent_offsets[i]:parent_offsets[i + 1]], and its CPT is
+    cpt[cpt_offsets[i]:cpt_offsets[i + 1]], P(i is True) for every parent assignment in
+    itertools.product((True, False), ...) order, so the first parent is the slowest-changing.
+    """
+    def __init__(self, names, parent_offsets, parent_index, cpt_offsets, cpt):
+        self.names = names
+        self.ids = {name: i for i, name in enumerate(names)}
+        self.parent_offsets = parent_offsets
+        self.parent_index = parent_index
+        self.cpt_offsets = cpt_offsets
+        self.cpt = cpt
+
+    def __len__(self):
+        return len(self.names)
+
+    def __repr__(self):
+        return "CompiledBayesNet({} variables, {} CPT entries)".format(len(self.names), len(self.cpt))
+
+    def compile(self):
+        """
+        Already compiled, so inference routines can call compile() on either kind of net
+
+        Parameters:
+        None
+
+        Returns:
+        CompiledBayesNet
+        """
+        return self
+
+    def parents(self, i):
+        """
+        Gets the parents of a variable
+
+        Parameters:
+        i (int): id of the variable
+
+        Returns:
+        array of parent ids
+        """
+        return self.parent_index[self.parent_offsets[i]:self.parent_offsets[i + 1]]
+
+    def probability(self, i, hypothesis, assignment):
+        """
+        Looks up P(variable i = hypothesis | its parents) in the CPT
+
+        Parameters:
+        i (int): id of the variable
+        hypothesis (Boolean): is the hypothesis True or False?
+        assignment (list): value of every variable by id; the parents of i must be set
+
+        Returns:
+        Float
+        """
+        row = 0
+        for e in range(self.parent_offsets[i], self.parent_offsets[i + 1]):
+            row = 2 * row + (0 if assignment[self.parent_index[e]] else 1)
+        v = self.cpt[self.cpt_offsets[i] + row]
+        if hypothesis:
+            return v
+        else:
+            return 1-v
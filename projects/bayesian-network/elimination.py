@@ -0,0 +1,154 @@
+from itertools import product
+import factors as arrays
+
+# variable elimination over a BayesNet: instead of enumerating every assignment of the hidden
+# variables, multiply together only the factors that mention one hidden variable at a time and
+# sum it out, so the cost grows with the largest intermediate factor rather than with 2**hidden
+
+class Factor:
+	"""A table over boolean variables: vars is a tuple of names and table maps a tuple of
+	bools, one per variable in that order, to a number."""
+	__slots__ = ("vars", "table")
+
+	def __init__(self, vars, table):
+		self.vars = vars
+		self.table = table
+
+	def __repr__(self):
+		return "Factor({}, {} entries)".format(self.vars, len(self.table))
+
+	def __getitem__(self, key):
+		return self.table[key]
+
+	def normalized(self):
+		"""The factor scaled to sum to 1, or unchanged if it sums to 0."""
+		total = sum(self.table.values())
+		if total <= 0:
+			return self
+		return Factor(self.vars, {key: p / total for key, p in self.table.items()})
+
+	def restrict(self, evidence):
+		"""The factor with every variable in evidence fixed to its value and dropped."""
+		fixed = [i for i, v in enumerate(self.vars) if v in evidence]
+		if not fixed:
+			return self
+		keep = [i for i, v in enumerate(self.vars) if v not in evidence]
+		table = {}
+		for key, p in self.table.items():
+			if all(key[i] == evidence[self.vars[i]] for i in fixed):
+				table[tuple(key[i] for i in keep)] = p
+		return Factor(tuple(self.vars[i] for i in keep), table)
+
+
+def node_factor(bn, i):
+	"""The CPT of variable i of a CompiledBayesNet as a Factor over its parents followed by i
+	itself; factors name variables by id."""
+	parents = tuple(bn.parents(i))
+	offset = bn.cpt_offsets[i]
+	table = {}
+	for row, key in enumerate(product((True, False), repeat=len(parents))):
+		v = bn.cpt[offset + row]
+		table[key + (True,)] = v
+		table[key + (False,)] = 1 - v
+	return Factor(parents + (i,), table)
+
+def project(factors, keep):
+	"""Multiply factors together and sum every variable except those in keep out of the
+	product, without building the full product table first. The result is over keep, in
+	that order."""
+	vars = tuple(keep)
+	rest = []
+	for f in factors:
+		rest += [v for v in f.vars if v not in vars and v not in rest]
+	#for every factor, where each of its variables sits in (assignment of vars) + (assignment of rest)
+	where = {v: i for i, v in enumerate(vars + tuple(rest))}
+	lookups = [(f.table, [where[v] for v in f.vars]) for f in factors]
+	summed = list(product((True, False), repeat=len(rest)))
+	table = {}
+	for key in product((True, False), repeat=len(vars)):
+		total = 0.0
+		for other in summed:
+			full = key + other
+			p = 1.0
+			for t, positions in lookups:
+				p *= t[tuple(full[i] for i in positions)]
+			total += p
+		table[key] = total
+	return Factor(vars, table)
+
+def sum_product(factors, var):
+	"""Multiply factors together and sum var out of the product."""
+	vars = []
+	for f in factors:
+		vars += [v for v in f.vars if v != var and v not in vars]
+	return project(factors, vars)
+
+def relevant_nodes(bn, ids):
+	"""The variables of a CompiledBayesNet that are ancestors of (or among) ids, in id order.
+	Every other variable sums out to 1, so inference never needs to look at it."""
+	needed = set()
+	stack = list(ids)
+	while stack:
+		i = stack.pop()
+		if i not in needed:
+			needed.add(i)
+			stack += bn.parents(i)
+	return sorted(needed)
+
+def elimination_order(factors, hidden):
+	"""Greedy min-degree order: repeatedly eliminate the hidden variable with the fewest
+	neighbors in the interaction graph of factors, connecting its neighbors as it goes."""
+	neighbors = {}
+	for f in factors:
+		for v in f.vars:
+			neighbors.setdefault(v, set()).update(f.vars)
+	for v, adjacent in neighbors.items():
+		adjacent.discard(v)
+	order = []
+	left = set(hidden)
+	while left:
+		var = min(left, key=lambda v: (len(neighbors[v]), v))
+		left.remove(var)
+		order.append(var)
+		adjacent = neighbors.pop(var)
+		for v in adjacent:
+			neighbors[v].discard(var)
+			neighbors[v].update(adjacent - {v})
+	return order
+
+def posterior(var, evidence, bn, order=None, numpy=False):
+	"""P(var | evidence) as {True: p, False: 1 - p}; bn is a BayesNet or a CompiledBayesNet.
+	order lists the variables to sum out in the order to eliminate them (names that turn out
+	not to matter are skipped); by default elimination_order() picks one. With numpy=True the
+	factors are factors.ArrayFactor tables and every product and sum is an array operation.
+	If var is also in evidence its value there is ignored, as ask does."""
+	bn = bn.compile()
+	ids = bn.ids
+	query = ids[var]
+	evidence = {ids[k]: v for k, v in evidence.items() if k != var}
+	nodes = relevant_nodes(bn, [query, *evidence])
+	build, eliminate = (arrays.node_factor, arrays.sum_product) if numpy else (node_factor, sum_product)
+	factors = [build(bn, i).restrict(evidence) for i in nodes]
+	factors = [f for f in factors if f.vars] #fully observed CPT entries only scale both answers
+	hidden = set(nodes) - evidence.keys() - {query}
+	if order is None:
+		order = elimination_order(factors, hidden)
+	else:
+		order = [ids[name] for name in order if ids.get(name) in hidden]
+		if len(set(order)) != len(hidden):
+			missing = hidden - set(order)
+			raise ValueError("order leaves out hidden variables {}".format(sorted(bn.names[i] for i in missing)))
+	for i in order:
+		mentioned = [f for f in factors if i in f.vars]
+		factors = [f for f in factors if i not in f.vars]
+		factors.append(eliminate(mentioned, i))
+	joint = {True: 1.0, False: 1.0}
+	for f in factors: #what is left mentions var or nothing
+		for value in (True, False) if f.vars else ():
+			joint[value] *= f[(value,)]
+	alpha = joint[True] + joint[False]
+	return {True: joint[True] / alpha, False: joint[False] / alpha}
+
+def ask(var, value, evidence, bn, order=None, numpy=False):
+	"""my_network.ask() by variable elimination: P(var = value | evidence)."""
+	return posterior(var, evidence, bn, order, numpy)[value]
@@ -0,0 +1,90 @@
+# factors as dense NumPy arrays: one axis of length 2 per variable, index 0 for True and 1 for
+# False (the order the dict factors in elimination.py enumerate them in), so product, summing
+# out and evidence reduction are whole-array operations instead of one dict lookup per entry.
+# numpy is optional: without it this module imports, but building a factor raises ImportError
+
+try:
+	import numpy as np
+except ImportError:
+	np = None
+
+def _axis(value):
+	return 0 if value else 1
+
+class ArrayFactor:
+	"""A factor over boolean variables: vars is a tuple of names and table an ndarray with one
+	axis per variable, table[i, j, ...] being the entry with vars[0] = (i == 0) and so on."""
+	__slots__ = ("vars", "table")
+
+	def __init__(self, vars, table):
+		if np is None:
+			raise ImportError("array factors need numpy")
+		self.vars = vars
+		self.table = table
+
+	def __repr__(self):
+		return "ArrayFactor({}, {} entries)".format(self.vars, self.table.size)
+
+	def __getitem__(self, key):
+		#key is a tuple of bools, one per variable, like a dict Factor's table keys
+		return float(self.table[tuple(_axis(v) for v in key)])
+
+	def normalized(self):
+		"""The factor scaled to sum to 1, or unchanged if it sums to 0."""
+		total = float(self.table.sum())
+		if total <= 0:
+			return self
+		return ArrayFactor(self.vars, self.table / total)
+
+	def restrict(self, evidence):
+		"""The factor with every variable in evidence fixed to its value and its axis dropped."""
+		if not any(v in evidence for v in self.vars):
+			return self
+		index = tuple(_axis(evidence[v]) if v in evidence else slice(None) for v in self.vars)
+		return ArrayFactor(tuple(v for v in self.vars if v not in evidence), self.table[index])
+
+	def multiply(self, other):
+		"""The pointwise product, over the union of both factors' variables."""
+		vars = self.vars + tuple(v for v in other.vars if v not in self.vars)
+		return ArrayFactor(vars, _einsum([self, other], vars))
+
+	def sum_out(self, var):
+		"""The factor with var summed away."""
+		axis = self.vars.index(var)
+		return ArrayFactor(self.vars[:axis] + self.vars[axis + 1:], self.table.sum(axis=axis))
+
+
+def _einsum(factors, out):
+	#einsum labels are small ints, so number the variables of this one call from 0
+	labels = {v: i for i, v in enumerate(out)}
+	args = []
+	for f in factors:
+		args += [f.table, [labels.setdefault(v, len(labels)) for v in f.vars]]
+	return np.einsum(*args, [labels[v] for v in out])
+
+def node_factor(bn, i):
+	"""The CPT of variable i of a CompiledBayesNet as an ArrayFactor over its parents followed
+	by i itself. The CPT is already laid out True-first with the first parent slowest, so it
+	only needs a reshape."""
+	if np is None:
+		raise ImportError("array factors need numpy")
+	parents = tuple(bn.parents(i))
+	p = np.array(bn.cpt[bn.cpt_offsets[i]:bn.cpt_offsets[i + 1]]).reshape((2,) * len(parents))
+	return ArrayFactor(parents + (i,), np.stack([p, 1 - p], axis=-1))
+
+def project(factors, keep):
+	"""elimination.project() on ArrayFactors: one einsum multiplies them and sums out every
+	variable not in keep."""
+	if np is None:
+		raise ImportError("array factors need numpy")
+	keep = tuple(keep)
+	if not factors:
+		return ArrayFactor(keep, np.ones((2,) * len(keep)))
+	return ArrayFactor(keep, _einsum(factors, keep))
+
+def sum_product(factors, var):
+	"""elimination.sum_product() on ArrayFactors."""
+	vars = []
+	for f in factors:
+		vars += [v for v in f.vars if v != var and v not in vars]
+	return project(factors, vars)
@@ -0,0 +1,141 @@
+import elimination
+import factors as arrays
+
+# junction-tree (clique-tree) inference: the network is moralized, triangulated and split into
+# cliques once; for each evidence set one round of message passing calibrates the tree, and
+# after that any variable's posterior comes from the smallest clique holding it
+
+class JunctionTree:
+	"""Clique tree over a BayesNet or CompiledBayesNet. cliques[c] is a tuple of variable ids,
+	neighbors[c] the cliques joined to c and separators[(c, d)] the variables c and d share.
+	Every CPT sits in one clique holding its variable and parents. The tree calibrates on the
+	first query with a new evidence set and stays calibrated until the evidence changes;
+	calibrations counts how many times that happened. With numpy=True the potentials and
+	messages are factors.ArrayFactor tables."""
+	def __init__(self, bn, numpy=False):
+		self.bn = bn = bn.compile()
+		self.numpy = numpy
+		self._build, self._project = (arrays.node_factor, arrays.project) if numpy else (elimination.node_factor, elimination.project)
+		self.cliques = _triangulate(bn)
+		self.neighbors, self.separators = _spanning_tree(self.cliques)
+		#each family goes to the smallest clique that holds it
+		self.families = [[] for _ in self.cliques]
+		for i in range(len(bn)):
+			family = set(bn.parents(i)) | {i}
+			c = min((c for c, clique in enumerate(self.cliques) if family <= set(clique)), key=lambda c: len(self.cliques[c]))
+			self.families[c].append(i)
+		self.home = [min((c for c, clique in enumerate(self.cliques) if i in clique), key=lambda c: len(self.cliques[c]))
+			for i in range(len(bn))]
+		self._schedule = _schedule(self.neighbors)
+		self._evidence = None
+		self._potentials = self._messages = None
+		self._marginals = {}
+		self.calibrations = 0
+
+	def __repr__(self):
+		return "JunctionTree({} cliques, largest {}, calibrations={})".format(
+			len(self.cliques), max(map(len, self.cliques), default=0), self.calibrations)
+
+	def calibrate(self, evidence):
+		"""Pass messages up and back down the tree for evidence (names -> values), unless the
+		tree is already calibrated for exactly this evidence."""
+		ids = self.bn.ids
+		evidence = {ids[name]: value for name, value in evidence.items()}
+		if evidence == self._evidence:
+			return
+		potentials = [[self._build(self.bn, i).restrict(evidence) for i in family] for family in self.families]
+		messages = {}
+		for c, d in self._schedule: #leaves to root, then root to leaves
+			incoming = [messages[(b, c)] for b in self.neighbors[c] if b != d]
+			keep = [v for v in self.separators[(c, d)] if v not in evidence]
+			messages[(c, d)] = self._project(potentials[c] + incoming, keep).normalized()
+		self._evidence = evidence
+		self._potentials, self._messages = potentials, messages
+		self._marginals = {}
+		self.calibrations += 1
+
+	def posterior(self, var, evidence):
+		"""P(var | evidence) as {True: p, False: 1 - p}. As with ask, a value for var in
+		evidence is ignored."""
+		evidence = {k: v for k, v in evidence.items() if k != var}
+		self.calibrate(evidence)
+		i = self.bn.ids[var]
+		if i not in self._marginals:
+			c = self.home[i]
+			incoming = [self._messages[(b, c)] for b in self.neighbors[c]]
+			f = self._project(self._potentials[c] + incoming, [i])
+			alpha = f[(True,)] + f[(False,)]
+			self._marginals[i] = {True: f[(True,)] / alpha, False: f[(False,)] / alpha}
+		return self._marginals[i]
+
+	def posteriors(self, evidence):
+		"""The posterior of every variable not in evidence, {name: {True: p, False: 1 - p}},
+		from a single calibration."""
+		self.calibrate(evidence)
+		return {name: self.posterior(name, evidence) for name in self.bn.names if name not in evidence}
+
+	def ask(self, var, value, evidence):
+		"""my_network.ask() on the calibrated tree: P(var = value | evidence)."""
+		return self.posterior(var, evidence)[value]
+
+
+def _triangulate(bn):
+	#moralize (marry the parents of every variable), then eliminate variables greedily by fewest
+	#neighbors; each elimination gives a clique, kept unless an earlier clique already holds it
+	neighbors = [set() for _ in range(len(bn))]
+	for i in range(len(bn)):
+		family = list(bn.parents(i)) + [i]
+		for v in family:
+			neighbors[v].update(family)
+	for v, adjacent in enumerate(neighbors):
+		adjacent.discard(v)
+	cliques = []
+	left = set(range(len(bn)))
+	while left:
+		v = min(left, key=lambda v: (len(neighbors[v]), v))
+		left.remove(v)
+		clique = neighbors[v] | {v}
+		if not any(clique <= set(c) for c in cliques):
+			cliques.append(tuple(sorted(clique)))
+		for u in neighbors[v]:
+			neighbors[u].discard(v)
+			neighbors[u].update(neighbors[v] - {u})
+	return cliques
+
+def _spanning_tree(cliques):
+	#maximum-weight spanning tree on shared variables (Kruskal); disconnected parts of the net
+	#get joined through empty separators, so the result is always one tree
+	pairs = sorted(((len(set(a) & set(b)), c, d) for c, a in enumerate(cliques) for d, b in enumerate(cliques) if c < d),
+		reverse=True)
+	root = list(range(len(cliques)))
+	def find(c):
+		while root[c] != c:
+			root[c] = root[root[c]]
+			c = root[c]
+		return c
+	neighbors = [[] for _ in cliques]
+	separators = {}
+	for _, c, d in pairs:
+		if find(c) != find(d):
+			root[find(c)] = find(d)
+			neighbors[c].append(d)
+			neighbors[d].append(c)
+			separators[(c, d)] = separators[(d, c)] = tuple(sorted(set(cliques[c]) & set(cliques[d])))
+	return neighbors, separators
+
+def _schedule(neighbors):
+	#message order from clique 0: every child -> parent edge after its own subtree (collect),
+	#then every parent -> child edge from the root down (distribute)
+	if not neighbors:
+		return []
+	order, parent = [], {0: None}
+	stack = [0]
+	while stack:
+		c = stack.pop()
+		order.append(c)
+		for d in neighbors[c]:
+			if d not in parent:
+				parent[d] = c
+				stack.append(d)
+	up = [(c, parent[c]) for c in reversed(order) if parent[c] is not None]
+	return up + [(d, c) for c, d in reversed(up)]
@@ -1,6 +1,10 @@
 from bayesnet import BayesNet, BayesNode
-from my_network import ask
+from my_network import ask, ask_all, ask_batch, EnumerationCache
+import elimination
+import factors
+import junction_tree
 import unittest
+import weakref
 
 class BayesTest(unittest.TestCase):
 
@@ -44,6 +48,134 @@ class BayesTest(unittest.TestCase):
 		print('P(-e)=',a)
 		self.assertAlmostEqual( 0.998, a)
 
+	def test6(self):
+		bn = self.makeBurglaryNet()
+		queries = [('Alarm', True, {'Burglar':True, 'Earthquake':True}), ('Burglar', True, {'JohnCalls':True,'MaryCalls':True}),
+			('Alarm', True, {}), ('Alarm', True, {'Burglar':False}), ('Earthquake', False, {'Burglar':True}),
+			('JohnCalls', False, {'MaryCalls':True})]
+		for var, value, evidence in queries:
+			self.assertAlmostEqual(ask(var, value, evidence, bn), ask(var, value, evidence, bn, method='elimination'))
+		order = ['Alarm', 'Earthquake', 'MaryCalls', 'JohnCalls']
+		self.assertAlmostEqual(0.2841718, elimination.ask('Burglar', True, {'JohnCalls':True,'MaryCalls':True}, bn, order))
+		with self.assertRaises(ValueError):
+			elimination.ask('Burglar', True, {'JohnCalls':True}, bn, ['Alarm'])
+
+	def test7(self):
+		# a 60-link chain has 2**59 hidden assignments to enumerate but eliminates link by link
+		bn = BayesNet()
+		bn.add(BayesNode('X0', None, {'':0.3}))
+		for i in range(1, 60):
+			bn.add(BayesNode('X%d' % i, ['X%d' % (i - 1)], {True:0.9, False:0.2}))
+		p = 0.3
+		for i in range(1, 60):
+			p = 0.9 * p + 0.2 * (1 - p)
+		self.assertAlmostEqual(p, ask('X59', True, {}, bn, method='elimination'))
+		self.assertAlmostEqual(0.9, ask('X59', True, {'X58':True, 'X0':False}, bn, method='elimination'))
+
+	@unittest.skipUnless(factors.np is not None, 'array factors need numpy')
+	def test8(self):
+		bn = self.makeBurglaryNet()
+		cbn = bn.compile()
+		b, e, a, j = (cbn.ids[name] for name in ('Burglar', 'Earthquake', 'Alarm', 'JohnCalls'))
+		alarm, john = factors.node_factor(cbn, a), factors.node_factor(cbn, j)
+		joint = alarm.multiply(john)
+		self.assertEqual(joint.vars, (b, e, a, j))
+		self.assertAlmostEqual(0.94 * 0.9, joint[(True, False, True, True)])
+		self.assertAlmostEqual(1.0, joint.sum_out(j).sum_out(a)[(False, True)])
+		self.assertAlmostEqual(0.06, alarm.restrict({b:True, a:False})[(False,)])
+		for var, value, evidence in [('Burglar', True, {'JohnCalls':True,'MaryCalls':True}), ('Alarm', True, {'Burglar':False}),
+				('Earthquake', False, {'MaryCalls':True})]:
+			self.assertAlmostEqual(ask(var, value, evidence, bn), elimination.ask(var, value, evidence, bn, numpy=True))
+
+	def test9(self):
+		bn = self.makeBurglaryNet()
+		cbn = bn.compile()
+		self.assertEqual(cbn.names, bn.variable_names)
+		self.assertEqual(list(cbn.parents(cbn.ids['Alarm'])), [cbn.ids['Burglar'], cbn.ids['Earthquake']])
+		assignment = [False, True, True, None, None]
+		self.assertAlmostEqual(0.29, cbn.probability(cbn.ids['Alarm'], True, assignment))
+		self.assertAlmostEqual(0.998, cbn.probability(cbn.ids['Earthquake'], False, assignment))
+		for method in ('enumeration', 'elimination'):
+			self.assertAlmostEqual(0.2841718, ask('Burglar', True, {'JohnCalls':True,'MaryCalls':True}, cbn, method))
+		# compile() puts parents first even if the variables list was reordered by hand
+		bn.variables.reverse()
+		bn.variable_names.reverse()
+		self.assertEqual(set(bn.compile().names[:2]), {'Burglar', 'Earthquake'})
+		self.assertAlmostEqual(0.001578, ask('Alarm', True, {'Burglar':False}, bn))
+		bn.variables[-1].parents = ['MaryCalls'] # Burglar -> Alarm -> MaryCalls -> Burglar
+		with self.assertRaises(ValueError):
+			bn.compile()
+
+	def test10(self):
+		bn = self.makeBurglaryNet()
+		evidence = {'JohnCalls':True, 'MaryCalls':True}
+		for numpy in (False, True) if factors.np is not None else (False,):
+			tree = junction_tree.JunctionTree(bn, numpy)
+			for var in ('Burglar', 'Earthquake', 'Alarm'):
+				for value in (True, False):
+					self.assertAlmostEqual(ask(var, value, evidence, bn), tree.ask(var, value, evidence))
+			self.assertEqual(tree.calibrations, 1)
+			self.assertAlmostEqual(0.001578, tree.ask('Alarm', True, {'Burglar':False}))
+			self.assertAlmostEqual(0.2841718, tree.ask('Burglar', True, evidence))
+			self.assertEqual(tree.calibrations, 3)
+
+	def test11(self):
+		bn = self.makeBurglaryNet()
+		evidence = {'JohnCalls':True, 'MaryCalls':True}
+		everything = ask_all(evidence, bn)
+		self.assertEqual(set(everything), {'Burglar', 'Earthquake', 'Alarm'})
+		for var, dist in everything.items():
+			self.assertAlmostEqual(ask(var, True, evidence, bn), dist[True])
+			self.assertAlmostEqual(1, dist[True] + dist[False])
+		queries = [('Burglar', evidence), (('Alarm', True), {'Burglar':False}), (('Earthquake', False), {'Burglar':True}),
+			(('Alarm', True), {'Burglar':True, 'Earthquake':True}), ('Earthquake', evidence), (('Burglar', True), {'Burglar':False})]
+		answers = ask_batch(queries, bn)
+		self.assertAlmostEqual(0.2841718, answers[0][True])
+		self.assertAlmostEqual(0.001578, answers[1])
+		self.assertAlmostEqual(0.998, answers[2])
+		self.assertAlmostEqual(0.95, answers[3])
+		self.assertAlmostEqual(ask('Earthquake', True, evidence, bn), answers[4][True])
+		self.assertAlmostEqual(0.001, answers[5])
+
+	def test12(self):
+		bn = self.makeBurglaryNet()
+		cache = EnumerationCache()
+		self.assertAlmostEqual(0.2841718, ask('Burglar', True, {'JohnCalls':True,'MaryCalls':True}, bn, 'memoized', cache))
+		self.assertAlmostEqual(0.001578, ask('Alarm', True, {'Burglar':False}, bn, 'memoized', cache))
+		self.assertAlmostEqual(0.998, ask('Earthquake', False, {'Burglar':True}, bn, 'memoized'))
+		# asking again reuses every sum, so it answers from the first lookup
+		hits = cache.hits
+		self.assertAlmostEqual(0.001578, ask('Alarm', True, {'Burglar':False}, bn, 'memoized', cache))
+		self.assertEqual(cache.hits, hits + 2)
+		# a 60-link chain only has two frontier values per link, and a tiny cache still gives the same answer
+		chain = BayesNet()
+		chain.add(BayesNode('X0', None, {'':0.3}))
+		for i in range(1, 60):
+			chain.add(BayesNode('X%d' % i, ['X%d' % (i - 1)], {True:0.9, False:0.2}))
+		expected = ask('X59', True, {'X0':True}, chain, 'elimination')
+		self.assertAlmostEqual(expected, ask('X59', True, {'X0':True}, chain, 'memoized', cache))
+		self.assertLessEqual(len(cache), cache.maxsize)
+		small = EnumerationCache(maxsize=8)
+		self.assertAlmostEqual(expected, ask('X59', True, {'X0':True}, chain, 'memoized', small))
+		self.assertEqual(len(small), 8)
+
+	def test13(self):
+		# a memoized cache follows the network through add() and CPT edits, and does not keep it alive
+		bn = BayesNet()
+		bn.add(BayesNode('A', None, {'':0.3}))
+		bn.add(BayesNode('B', ['A'], {True:0.9, False:0.2}))
+		cache = EnumerationCache()
+		for c in (cache, None):
+			self.assertAlmostEqual(0.41, ask('B', True, {}, bn, 'memoized', c))
+		bn.add(BayesNode('C', ['B'], {True:0.5, False:0.1}))
+		for c in (cache, None):
+			self.assertAlmostEqual(ask('B', True, {'C':True}, bn), ask('B', True, {'C':True}, bn, 'memoized', c))
+		bn.variables[0].values[''] = 0.5
+		self.assertAlmostEqual(0.55, ask('B', True, {}, bn, 'memoized', cache))
+		net = weakref.ref(bn)
+		del bn
+		self.assertIsNone(net())
+
 
 if __name__== "__main__":
 	unittest.main()
\ No newline at end of file
@@ -1,51 +1,167 @@
-# recursive helper function 
-def helper(vars, unknowns, evidence, bn):
-	# set current variable and index
-	curr = vars.pop(0)
-	currind = bn.variable_names.index(curr)
-
-	if curr not in unknowns: 
-		result = bn.variables[currind].probability(evidence[curr], evidence)
-		# if len makes it possible, recurse
-		if len(vars) > 0: 
-			result *= helper(vars.copy(), unknowns, evidence, bn)
-		return result
+from array import array
+from collections import OrderedDict
+import elimination
+import junction_tree
+
+# recursive helper function: sums the joint probability over every unknown variable from id i on
+# bn is a CompiledBayesNet, so variables are visited in topological order by id, and assignment
+# holds the value of every variable by id (None while unknown); it is filled in and undone in place
+def helper(i, assignment, bn):
+	if i == len(bn):  # base case
+		return 1
+
+	if assignment[i] is not None:
+		return bn.probability(i, assignment[i], assignment) * helper(i + 1, assignment, bn)
 	else:
-		if len(vars) <= 0:  # base case
-			return 1
-		else:
-			# set up dictionaries
-			truedict = evidence.copy()
-			truedict[curr] = True
+		total = 0
+		for value in (True, False):
+			assignment[i] = value
+			total += bn.probability(i, value, assignment) * helper(i + 1, assignment, bn)
+		assignment[i] = None
+		return total
+			
 
-			falsedict = evidence.copy()
-			falsedict[curr] = False
+# memoized enumeration: the sum over variables i, i+1, ... only depends on the evidence and on the
+# earlier variables that are parents of one of them (the frontier of i), not on the whole assignment,
+# so it is cached under (evidence, i, values of the frontier) and every other path reaching i with
+# the same frontier values reuses it
+class EnumerationCache:
+	# a bounded LRU cache of those sums for one network, with hit statistics
+	# it keeps a copy of the compiled layout it was filled from (names, parents and CPTs) rather than
+	# the network itself, so it never keeps a network alive; when ask is given a network that differs
+	# from that copy, e.g. the same BayesNet after add() or a changed CPT, it empties itself first
+	def __init__(self, maxsize=100000):
+		self.maxsize = maxsize
+		self.hits = 0
+		self.misses = 0
+		self._sums = OrderedDict()
+		self._layout = None
+		self._frontiers = None
 
-			tp = helper(vars.copy(), unknowns, truedict, bn) * bn.variables[currind].probability(True, truedict)
-			fp = helper(vars.copy(), unknowns, falsedict, bn) * bn.variables[currind].probability(False, falsedict)
+	def __len__(self):
+		return len(self._sums)
 
-			return (tp + fp)
-			
+	def __repr__(self):
+		return "EnumerationCache(size={}/{}, hits={}, misses={})".format(len(self._sums), self.maxsize, self.hits, self.misses)
+
+	def clear(self):
+		self._sums.clear()
+		self._layout = self._frontiers = None
+
+	def _bind(self, bn):
+		# bn is the compiled network ask is about to enumerate
+		layout = (bn.names, bn.parent_offsets, bn.parent_index, bn.cpt_offsets, bn.cpt)
+		if layout == self._layout:
+			return
+		self.clear()
+		self._layout = (list(bn.names),) + tuple(array(a.typecode, a) for a in layout[1:])
+		last_child = [-1] * len(bn)
+		for k in range(len(bn)):
+			for j in bn.parents(k):
+				last_child[j] = max(last_child[j], k)
+		self._frontiers = [tuple(j for j in range(i) if last_child[j] >= i) for i in range(len(bn))]
+
+
+def memo_helper(i, assignment, bn, cache, evidence):
+	# helper with its suffix sums cached in cache; evidence is the assignment as it stood when the
+	# enumeration started, as a tuple, and is part of every key so the cache needs no other table
+	if i == len(bn):  # base case
+		return 1
+
+	key = (evidence, i, tuple([assignment[j] for j in cache._frontiers[i]]))
+	total = cache._sums.get(key)
+	if total is not None:
+		cache.hits += 1
+		cache._sums.move_to_end(key)
+		return total
+	cache.misses += 1
+
+	if assignment[i] is not None:
+		total = bn.probability(i, assignment[i], assignment) * memo_helper(i + 1, assignment, bn, cache, evidence)
+	else:
+		total = 0
+		for value in (True, False):
+			assignment[i] = value
+			total += bn.probability(i, value, assignment) * memo_helper(i + 1, assignment, bn, cache, evidence)
+		assignment[i] = None
+
+	cache._sums[key] = total
+	if len(cache._sums) > cache.maxsize:
+		cache._sums.popitem(last=False)
+	return total
 
-def ask(var, value, evidence, bn):
+
+# used by ask(method="memoized") when no cache is passed in
+enumeration_cache = EnumerationCache()
+
+
+def ask(var, value, evidence, bn, method="enumeration", cache=None):
 	# this function is meant to return the probability of hypothesis/model H given evidence E, P(H|E)
 	# var is the name of the hypothesis variable
 	# value is whether the hypothesis is True or False
 	# evidence is the SET of variables known to be True or False
-	# bn is the given BayesNet object
+	# bn is the given BayesNet object, or one already compiled with BayesNet.compile()
+	# method is "enumeration" (the recursive helper above), "memoized" (the same enumeration with its
+	# repeated sub-sums cached in cache, or in enumeration_cache if cache is None) or "elimination"
+	# (variable elimination, see elimination.py); all give the same answers, the last two on nets far
+	# too big to enumerate
 
 	# this function should calculate and return P(H, E) / alpha
 		# P(H, E) is the joint probability of the hypothesis (var = value) and the evidence (evidence)
 		# alpha is the Normalization constant (the joint probaility of NOT hypothesis and the evidence)
 
-	evcopy = evidence.copy()
-	evcopy[var] = value
+	if method == "elimination":
+		return elimination.ask(var, value, evidence, bn)
+	if method not in ("enumeration", "memoized"):
+		raise ValueError("method must be 'enumeration', 'memoized' or 'elimination', not {!r}".format(method))
+
+	bn = bn.compile()
+	assignment = [None] * len(bn)
+	for name in evidence:
+		assignment[bn.ids[name]] = evidence[name]
+	hypothesis = bn.ids[var]
+
+	if method == "memoized":
+		cache = enumeration_cache if cache is None else cache
+		cache._bind(bn)
+		joint = lambda: memo_helper(0, assignment, bn, cache, tuple(assignment))
+	else:
+		joint = lambda: helper(0, assignment, bn)
+
+	assignment[hypothesis] = value
+	probhe = joint()
 
 	#opposites
-	evcoppy = evidence.copy()
-	evcoppy[var] = not value
+	assignment[hypothesis] = not value
+	alpha = joint() + probhe
+
+	return (probhe / alpha)
+
+
+def ask_all(evidence, bn):
+	# the posterior of every variable not in evidence, as {name: {True: p, False: 1 - p}}
+	# one junction tree calibration answers all of them, instead of two enumerations per variable
+	return junction_tree.JunctionTree(bn).posteriors(evidence)
+
 
-	probhe = helper(bn.variable_names.copy(), bn.variable_names - evcopy.keys(), evcopy, bn)
-	alpha = helper(bn.variable_names.copy(), bn.variable_names - evcopy.keys(), evcoppy, bn) + probhe
+def ask_batch(queries, bn):
+	# answers a list of (query, evidence) pairs in order; a query is a variable name, answered with
+	# its {True: p, False: 1 - p} posterior, or a (name, value) pair, answered with P(name = value | evidence)
+	# the network is triangulated once, and queries sharing an evidence set share one calibration
+	# however they are interleaved
+	tree = junction_tree.JunctionTree(bn)
+	groups = {}
+	for n, (query, evidence) in enumerate(queries):
+		var = query[0] if isinstance(query, tuple) else query
+		# like ask, a value for the query variable in evidence is ignored, so it does not split groups
+		groups.setdefault(frozenset(item for item in evidence.items() if item[0] != var), []).append(n)
 
-	return (probhe / alpha)
\ No newline at end of file
+	answers = [None] * len(queries)
+	for group in groups.values():
+		for n in group:
+			query, evidence = queries[n]
+			if isinstance(query, tuple):
+				answers[n] = tree.ask(query[0], query[1], evidence)
+			else:
+				answers[n] = tree.posterior(query, evidence)
+	return answers
\ No newline at end of file
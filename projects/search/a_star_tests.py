@@ -1,7 +1,25 @@
 import unittest
 import my_search as sc
 import expand
+import graph
+import graph_io
+import fourgrid
+import landmarks
+import batch
+import contraction
+import bench
+import parallel
+import server
+import dense
+import asyncio, json
+import route_cache
+import copy
+import incremental
+import random
+import threading
+import os, tempfile
 import sys, signal
+import contextlib, io, math
 
 time_map1 = {
     'Campus':{ 'Campus':None, 'Whole_Food':1, 'Beach':1, 'Cinema':None, 'Lighthouse':1, 'Ryan_Field':None, 'YWCA':None },
@@ -216,4 +234,550 @@ class UnitTests(unittest.TestCase):
         self.assertEqual(path, ['l', 'p', 'o', 'n'])
         self.assertEqual(expand.expand_count, 4) 
 
+    def test15(self):
+        # ties on f go to the lower h, then to the earlier insertion; decrease-key reorders
+        q = sc.PriorityQ()
+        q.insert(sc.Node('x', 4, 2, 0))
+        q.insert(sc.Node('y', 5, 1, 1))
+        q.insert(sc.Node('z', 3, 3, 2))
+        q.insert(sc.Node('w', 2, 1, 3))
+        q.updateg('z', 1)
+        self.assertEqual(q.findg('z'), 1)
+        self.assertEqual([q.pop()._name for _ in range(4)], ['w', 'z', 'y', 'x'])
+        self.assertEqual(len(q), 0)
+
+    def test16(self):
+        g = graph.compile_map(time_mapM)
+        self.assertEqual((len(g), g.num_edges), (16, 30))
+        self.assertEqual(g.path_names(t for t, w in g.edges(g.ids['a'])), ['b', 'e'])
+        self.assertEqual(g.reverse().weight(g.ids['e'], g.ids['a']), 1)
+        self.assertIsNone(g.weight(g.ids['a'], g.ids['p']))
+
+    def test17(self):
+        # the compiled A* matches a_star_search path for path and expansion for expansion
+        cases = [(dis_map2, time_map2, 'Whole_Food', 'Ryan_Field'), (dis_map5, time_map5, 'Ryan_Field', 'CVS'),
+                 (dis_map5, time_map5, 'Campus', 'Cinema'), (dis_mapM, time_mapM, 'a', 'p'), (dis_mapM, time_mapM, 'l', 'n')]
+        for dis_map, time_map, start, end in cases:
+            expand.expand_count = 0
+            expected = sc.a_star_search(dis_map, time_map, start, end)
+            count = expand.expand_count
+            g = graph.compile_map(time_map)
+            expand.expand_count = 0
+            path = sc.a_star_search_compiled(g, start, end, graph.dis_map_heuristic(g, dis_map))
+            self.assertEqual(path, expected)
+            self.assertEqual(expand.expand_count, count)
+
+    def test18(self):
+        g = graph.compile_map(time_mapM)
+        expand.expand_count = 0
+        self.assertEqual(sc.breadth_first_search_compiled(g, 'a', 'g'), ['a', 'b', 'c', 'd', 'h', 'g'])
+        self.assertEqual(expand.expand_count, 8)
+        g = graph.compile_map(time_mapT)
+        expand.expand_count = 0
+        self.assertEqual(sc.depth_first_search_compiled(g, 'a', 'e'), ['a', 'b', 'e'])
+        self.assertEqual(expand.expand_count, 3)
+
+    def test19(self):
+        grid = fourgrid.FourGrid(60, 80, seed=7)
+        self.assertEqual(str(grid), str(fourgrid.FourGrid(60, 80, seed=7)))
+        self.assertTrue(grid[grid.start].passable and grid[grid.goal].passable)
+        expand.expand_count = 0
+        path = fourgrid.a_star_search(grid)
+        self.assertEqual((path[0], path[-1]), (grid.start, grid.goal))
+        for (r1, c1), (r2, c2) in zip(path, path[1:]):
+            self.assertEqual(abs(r1 - r2) + abs(c1 - c2), 1)
+            self.assertTrue(grid.passable(r2, c2))
+        self.assertLess(expand.expand_count, 60 * 80)
+        # both heuristics are admissible, so both paths are optimal
+        self.assertEqual(len(fourgrid.a_star_search(grid, heuristic='euclidean')), len(path))
+        for rows, cols in [(0, 5), (5, 0), (-1, 3)]:
+            with self.assertRaises(ValueError):
+                fourgrid.FourGrid(rows, cols)
+        self.assertEqual(fourgrid.a_star_search(fourgrid.FourGrid(1, 1)), [(0, 0)])
+
+    def test20(self):
+        cases = [(dis_map2, time_map2, 'YWCA', 'Campus'), (dis_map5, time_map5, 'Ryan_Field', 'CVS'),
+                 (dis_map5, time_map5, 'Campus', 'Cinema'), (dis_mapM, time_mapM, 'a', 'p'), (dis_mapM, time_mapM, 'h', 'a')]
+        for dis_map, time_map, start, end in cases:
+            expected = sc.a_star_search(dis_map, time_map, start, end)
+            self.assertEqual(sc.bidirectional_search(None, time_map, start, end), expected)
+            self.assertEqual(sc.bidirectional_search(dis_map, time_map, start, end), expected)
+        expand.expand_count = 0
+        rev = sc.reverse_time_map(time_map5)
+        self.assertEqual(rev['Whole_Food'], {'Campus': 28, 'Beach': 14, 'Cinema': 14})
+        path = sc.bidirectional_search(dis_map5, time_map5, 'CVS', 'Whole_Food', rev)
+        self.assertEqual(path, ['CVS', 'Cinema', 'Whole_Food'])
+        self.assertEqual(expand.expand_count, 3)
+        self.assertIsNone(sc.bidirectional_search(None, time_mapT, 'b', 'a'))
+
+    def test21(self):
+        index = landmarks.build_landmarks_for_map(time_map5, k=3)
+        g = index.graph
+        for u in range(len(g)):
+            dist, _ = graph.dijkstra(g, u)
+            for t in range(len(g)):
+                self.assertLessEqual(index.lower_bound(u, t), dist[t])
+        for start, end in [('Ryan_Field', 'CVS'), ('Campus', 'Cinema'), ('CVS', 'Whole_Food')]:
+            self.assertEqual(sc.a_star_search(index, time_map5, start, end), sc.a_star_search(dis_map5, time_map5, start, end))
+        path = sc.a_star_search_compiled(g, 'Campus', 'CVS', index.lower_bound)
+        self.assertEqual(path, ['Campus', 'Beach', 'Whole_Food', 'CVS'])
+
+        fd, name = tempfile.mkstemp(suffix='.alt')
+        os.close(fd)
+        try:
+            index.save(name)
+            loaded = landmarks.LandmarkIndex.load(name, g)
+        finally:
+            os.remove(name)
+        self.assertEqual(loaded.landmarks, index.landmarks)
+        self.assertEqual(loaded('YWCA', 'Beach'), index('YWCA', 'Beach'))
+        self.assertEqual(len(landmarks.build_landmarks_for_map(time_map5, k=100).landmarks), len(time_map5))
+        empty = landmarks.build_landmarks_for_map({})
+        self.assertEqual((empty.landmarks, len(empty.dist_from)), ([], 0))
+
+    def test22(self):
+        queries = [(a, b) for a in time_mapM for b in time_mapM]
+        paths = batch.batch_search(time_mapM, queries, metric='hops')
+        self.assertEqual(paths, [sc.breadth_first_search(time_mapM, a, b) for a, b in queries])
+        self.assertEqual(batch.batch_search(time_mapM, queries, metric='hops', processes=2), paths)
+        queries = [(a, b) for a in time_map2 for b in time_map2]
+        paths = batch.batch_search(graph.compile_map(time_map2), queries)
+        self.assertEqual(paths, [sc.a_star_search(dis_map2, time_map2, a, b) for a, b in queries])
+        self.assertEqual(batch.batch_search(time_mapT, [('b', 'a'), ('a', 'k')]), [None, ['a', 'c', 'h', 'k']])
+
+    def test23(self):
+        time_map = copy.deepcopy(time_mapM)
+        cache = route_cache.RouteCache(dis_mapM, time_map, maxsize=3)
+        self.assertEqual(cache.a_star_search('a', 'p'), ['a', 'b', 'c', 'd', 'h', 'g', 'f', 'j', 'n', 'o', 'p'])
+        cache.a_star_search('h', 'a')
+        cache.breadth_first_search('l', 'n')
+        expand.expand_count = 0
+        cache.a_star_search('a', 'p')
+        self.assertEqual((cache.hits, cache.misses, expand.expand_count), (1, 3, 0))
+        cache.a_star_search('a', 'd') # evicts the least recently used route, h -> a
+        self.assertEqual(len(cache), 3)
+        cache.a_star_search('h', 'a')
+        self.assertEqual((cache.hits, cache.misses), (1, 5))
+
+        # slowing h -> g only drops the routes that drive it
+        cache.update_edge('h', 'g', 5)
+        self.assertEqual((len(cache), cache.invalidations), (2, 1))
+        self.assertEqual(time_map['h']['g'], 5)
+        # opening a shortcut only drops the routes it could beat
+        cache.update_edge('a', 'f', 1)
+        self.assertEqual(cache.a_star_search('a', 'p'), sc.a_star_search(dis_mapM, time_map, 'a', 'p'))
+        self.assertEqual(cache.a_star_search('a', 'd'), ['a', 'b', 'c', 'd'])
+        self.assertEqual(cache.hits, 2)
+
+    def test24(self):
+        time_map = copy.deepcopy(time_map2)
+        planner = incremental.DStarLite(dis_map2, time_map, 'YWCA', 'Campus')
+        self.assertEqual(planner.plan(), ['YWCA', 'Ryan_Field', 'Lighthouse', 'Campus'])
+        planner.move_start('Ryan_Field')
+        planner.update_edge('Lighthouse', 'Campus', 40)
+        self.assertEqual(planner.plan(), sc.a_star_search(dis_map2, time_map, 'Ryan_Field', 'Campus'))
+        planner.update_edge('Lighthouse', 'Campus', 11)
+        self.assertEqual(planner.plan(), ['Ryan_Field', 'Lighthouse', 'Campus'])
+        self.assertEqual(planner.expansions, 2)
+        # zero-time roads make cost + g tie around a cycle; the path must still come out
+        loop = {'a': {'b': 0}, 'b': {'a': 0, 'c': 1}, 'c': {}}
+        zero = {u: {v: 0 for v in loop} for u in loop}
+        planner = incremental.DStarLite(zero, loop, 'a', 'c')
+        self.assertEqual(planner.plan(), ['a', 'b', 'c'])
+        planner.update_edge('a', 'c', 1) #a tie with the way through b
+        self.assertIn(planner.plan(), (['a', 'c'], ['a', 'b', 'c']))
+        planner.update_edge('b', 'c', None)
+        self.assertEqual(planner.plan(), ['a', 'c'])
+        planner.update_edge('a', 'c', None)
+        self.assertIsNone(planner.plan())
+
+    def test25(self):
+        # on a weighted 12x12 road grid, a replan after one slowdown beats a cold A* run by a wide margin
+        rng = random.Random(0)
+        cells = [(r, c) for r in range(12) for c in range(12)]
+        name = lambda cell: '%d_%d' % cell
+        time_map = {name(cell): {} for cell in cells}
+        for r, c in cells:
+            for nr, nc in ((r, c + 1), (r + 1, c), (r, c - 1), (r - 1, c)):
+                if 0 <= nr < 12 and 0 <= nc < 12:
+                    time_map[name((r, c))][name((nr, nc))] = rng.randint(1, 5)
+        dis_map = {name(a): {name(b): abs(a[0] - b[0]) + abs(a[1] - b[1]) for b in cells} for a in cells}
+        cost = lambda path: sum(time_map[a][b] for a, b in zip(path, path[1:]))
+
+        planner = incremental.DStarLite(dis_map, time_map, '0_0', '11_11')
+        path = planner.plan()
+        for _ in range(5):
+            planner.move_start(path[1])
+            planner.update_edge(path[2], path[3], time_map[path[2]][path[3]] + 6)
+            path = planner.plan()
+            expand.expand_count = 0
+            fresh = sc.a_star_search(dis_map, time_map, planner.start, '11_11')
+            self.assertEqual(cost(path), cost(fresh))
+            self.assertLess(planner.expansions * 5, expand.expand_count)
+
+    def test26(self):
+        expand.expand_count = 0
+        events = []
+        stats = expand.SearchStats(trace=lambda event, node: events.append(node))
+        path = sc.a_star_search(dis_mapM, time_mapM, 'a', 'p', stats=stats)
+        self.assertEqual(path, ['a', 'b', 'c', 'd', 'h', 'g', 'f', 'j', 'n', 'o', 'p'])
+        self.assertEqual((stats.expansions, expand.expand_count), (13, 0))
+        self.assertEqual(events[:4], ['a', 'b', 'c', 'd'])
+        self.assertGreaterEqual(stats.generated, stats.expansions)
+        self.assertGreater(stats.peak_frontier, 0)
+        self.assertGreater(stats.wall_time, 0)
+        # stats passed by position is timed too
+        stats = expand.SearchStats()
+        sc.ida_star_search(dis_mapM, time_mapM, 'a', 'p', None, stats)
+        self.assertGreater(stats.expansions, 0)
+        self.assertGreater(stats.wall_time, 0)
+
+    def test27(self):
+        # concurrent searches each get their own counts
+        cases = [(dis_map2, time_map2, 'Whole_Food', 'Ryan_Field', 5), (dis_map5, time_map5, 'Ryan_Field', 'CVS', 7),
+                 (dis_mapM, time_mapM, 'h', 'p', 8), (dis_mapM, time_mapM, 'l', 'n', 4)] * 4
+        results = [None] * len(cases)
+        def run(i, dis_map, time_map, start, end, count):
+            stats = expand.SearchStats()
+            sc.a_star_search(dis_map, time_map, start, end, stats=stats)
+            results[i] = stats.expansions
+        threads = [threading.Thread(target=run, args=(i,) + case) for i, case in enumerate(cases)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(results, [case[-1] for case in cases])
+
+    def test28(self):
+        visits = list(sc.traverse(time_mapT, 'a', 'depth'))
+        self.assertEqual(visits[:4], [('a', None, 0), ('b', 'a', 1), ('d', 'b', 2), ('e', 'b', 2)])
+        self.assertEqual(len(visits), 11)
+        self.assertEqual([node for node, _, depth in sc.traverse(time_mapM, 'a') if depth == 2], ['c', 'i'])
+        # stopping the generator early also stops the expansions
+        expand.expand_count = 0
+        walk = sc.traverse(time_mapM, 'a')
+        self.assertEqual([next(walk) for _ in range(3)], [('a', None, 0), ('b', 'a', 1), ('e', 'a', 1)])
+        self.assertEqual(expand.expand_count, 2)
+        # depth-first search expands a node reached again by a second path only once: d and e
+        # below are expanded once, where the old fringe-list DFS expanded them twice (7 in all)
+        diamond = {'a': {'b': 1, 'c': 1, 'g': 1}, 'b': {'d': 1}, 'c': {'d': 1}, 'd': {'e': 1}, 'e': {}, 'g': {}}
+        expand.expand_count = 0
+        self.assertEqual(sc.depth_first_search(diamond, 'a', 'g'), ['a', 'g'])
+        self.assertEqual(expand.expand_count, 5)
+
+    def test29(self):
+        # a long sparse ring: fringe and visited checks must not scan lists
+        n = 50000
+        ring = {str(i): {str((i + 1) % n): 1, str((i - 1) % n): 1} for i in range(n)}
+        stats = expand.SearchStats()
+        path = sc.breadth_first_search(ring, '0', str(n // 2), stats=stats)
+        self.assertEqual(len(path), n // 2 + 1)
+        self.assertEqual(stats.peak_frontier, 2)
+        path = sc.depth_first_search(ring, '0', str(n - 1), stats=expand.SearchStats())
+        self.assertEqual(len(path), n)
+
+    def test30(self):
+        grid = fourgrid.FourGrid(200, 200, seed=3, density=0.05)
+        totals = [0, 0]
+        for start, end in [(grid.start, grid.goal), ((150, 20), (10, 170)), ((5, 5), (5, 190))]:
+            a_star, jps = expand.SearchStats(), expand.SearchStats()
+            path = fourgrid.a_star_search(grid, start, end, stats=a_star)
+            jumped = fourgrid.jump_point_search(grid, start, end, stats=jps)
+            self.assertEqual(len(jumped), len(path))
+            self.assertEqual((jumped[0], jumped[-1]), (start, end))
+            for (r1, c1), (r2, c2) in zip(jumped, jumped[1:]):
+                self.assertEqual(abs(r1 - r2) + abs(c1 - c2), 1)
+                self.assertTrue(grid.passable(r2, c2))
+            self.assertLess(jps.expansions, a_star.expansions)
+            totals[0] += a_star.expansions
+            totals[1] += jps.expansions
+        # the documented 2-4x cut at this size
+        self.assertGreater(totals[0], 2 * totals[1])
+        blocked = fourgrid.FourGrid(3, 3, density=0)
+        blocked.cells[1:9:3] = b'\x01\x01\x01'
+        self.assertIsNone(fourgrid.jump_point_search(blocked, (0, 0), (0, 2)))
+
+    def test31(self):
+        # IDA* finds A*'s optimal paths with or without its transposition table
+        for dis_map, time_map, start, end in [(dis_map2, time_map2, 'Campus', 'YWCA'),
+                                              (dis_map2, time_map2, 'Beach', 'Cinema'),
+                                              (dis_mapM, time_mapM, 'a', 'p')]:
+            path = sc.a_star_search(dis_map, time_map, start, end, stats=expand.SearchStats())
+            cost = sum(time_map[a][b] for a, b in zip(path, path[1:]))
+            for budget in (None, 0, 2):
+                stats = expand.SearchStats()
+                found = sc.ida_star_search(dis_map, time_map, start, end, budget, stats=stats)
+                self.assertEqual(sum(time_map[a][b] for a, b in zip(found, found[1:])), cost)
+                self.assertEqual((found[0], found[-1]), (start, end))
+            self.assertGreaterEqual(stats.reexpansions, 0)
+
+    def test32(self):
+        # SMA* is optimal once the path fits in memory, and gives up cleanly when it cannot
+        path = sc.a_star_search(dis_mapM, time_mapM, 'a', 'p', stats=expand.SearchStats())
+        cost = sum(time_mapM[a][b] for a, b in zip(path, path[1:]))
+        for budget in (len(path), len(path) + 2, 100):
+            stats = expand.SearchStats()
+            found = sc.sma_star_search(dis_mapM, time_mapM, 'a', 'p', budget, stats=stats)
+            self.assertEqual(sum(time_mapM[a][b] for a, b in zip(found, found[1:])), cost)
+            self.assertLessEqual(stats.peak_frontier, budget)
+        self.assertIsNone(sc.sma_star_search(dis_mapM, time_mapM, 'a', 'p', len(path) - 1, stats=expand.SearchStats()))
+        tight, ample = expand.SearchStats(), expand.SearchStats()
+        sc.sma_star_search(dis_map2, time_map2, 'Campus', 'YWCA', 4, stats=tight)
+        sc.sma_star_search(dis_map2, time_map2, 'Campus', 'YWCA', 100, stats=ample)
+        self.assertGreater(tight.reexpansions, ample.reexpansions)
+        # on random maps with tight budgets the path is the cheapest that fits, never cheaper than
+        # Dijkstra, and optimal whenever strict=True returns one
+        for seed in range(60):
+            rng = random.Random(seed)
+            names = [str(i) for i in range(10)]
+            spot = {u: (rng.uniform(0, 10), rng.uniform(0, 10)) for u in names}
+            time_map = {u: {v: None for v in names} for u in names}
+            for u in names:
+                for v in rng.sample(names, 3):
+                    if v != u:
+                        time_map[u][v] = int(math.dist(spot[u], spot[v])) + 1 + rng.randint(0, 3)
+            dis_map = {u: {v: math.dist(spot[u], spot[v]) for v in names} for u in names}
+            compiled = graph.compile_map(time_map)
+            for _ in range(4):
+                start, end = rng.sample(names, 2)
+                dist, parents = graph.dijkstra(compiled, compiled.ids[start])
+                best = dist[compiled.ids[end]]
+                hops, v = 1, compiled.ids[end]
+                while parents[v] != -1:
+                    hops, v = hops + 1, parents[v]
+                for budget in (3, 5):
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        found = sc.sma_star_search(dis_map, time_map, start, end, budget)
+                        proved = sc.sma_star_search(dis_map, time_map, start, end, budget, strict=True)
+                    if best == float('inf'):
+                        self.assertIsNone(found)
+                        continue
+                    if found is not None:
+                        self.assertLessEqual(len(found), budget)
+                        self.assertGreaterEqual(sum(time_map[a][b] for a, b in zip(found, found[1:])), best)
+                    if hops <= budget:
+                        self.assertEqual(sum(time_map[a][b] for a, b in zip(found, found[1:])), best)
+                    if proved is not None:
+                        self.assertEqual(sum(time_map[a][b] for a, b in zip(proved, proved[1:])), best)
+
+    def test33(self):
+        # hierarchy queries unpack to full roads and match Dijkstra's travel times, before and after a save/load
+        rng = random.Random(5)
+        names = [str(i) for i in range(60)]
+        time_map = {a: {b: rng.randint(1, 9) for b in rng.sample(names, 3) if b != a} for a in names}
+        g = graph.compile_map(time_map)
+        ch = contraction.build_hierarchy(g)
+        fd, name = tempfile.mkstemp(suffix='.ch')
+        os.close(fd)
+        try:
+            ch.save(name)
+            loaded = contraction.ContractionHierarchy.load(name, g)
+        finally:
+            os.remove(name)
+        for u in range(0, 60, 7):
+            dist, _ = graph.dijkstra(g, u)
+            for t in range(60):
+                path = loaded.query(names[u], names[t], stats=expand.SearchStats())
+                if dist[t] == float('inf'):
+                    self.assertIsNone(path)
+                    continue
+                self.assertEqual((path[0], path[-1]), (names[u], names[t]))
+                self.assertEqual(sum(time_map[a][b] for a, b in zip(path, path[1:])), dist[t])
+        # cutting witness searches short only adds shortcuts, the answers stay the same
+        tight = contraction.build_hierarchy(g, settle_limit=4, hop_limit=1)
+        self.assertGreaterEqual(tight.up.num_edges, ch.up.num_edges)
+        for u in range(0, 60, 11):
+            dist, _ = graph.dijkstra(g, u)
+            for t in range(60):
+                path = tight.query(names[u], names[t], stats=expand.SearchStats())
+                if dist[t] != float('inf'):
+                    self.assertEqual(sum(time_map[a][b] for a, b in zip(path, path[1:])), dist[t])
+        ch = contraction.build_hierarchy_for_map(time_map2)
+        for a in time_map2:
+            for b in time_map2:
+                self.assertEqual(ch.query(a, b), sc.a_star_search(dis_map2, time_map2, a, b))
+
+    def test34(self):
+        # edge lists and DIMACS files compile to the same roads as the dict they describe
+        directory = tempfile.mkdtemp()
+        edges = os.path.join(directory, 'map.txt')
+        with open(edges, 'w') as f:
+            f.write('# node next time\n')
+            for a in time_map2:
+                for b, t in time_map2[a].items():
+                    if t is not None:
+                        f.write('{} {} {}\n'.format(a, b, t))
+        dimacs = os.path.join(directory, 'map.gr')
+        with open(dimacs, 'w') as f:
+            f.write('c three nodes\np sp 3 3\na 1 2 4\na 2 3 1.5\na 1 3 7\n')
+        mapped = os.path.join(directory, 'map.csr')
+        try:
+            g = graph_io.load_edge_list(edges)
+            self.assertEqual(sorted(g.names), sorted(time_map2))
+            for a in time_map2:
+                self.assertEqual({g.names[v]: t for v, t in g.edges(g.ids[a])},
+                                 {b: t for b, t in time_map2[a].items() if t is not None})
+            self.assertEqual(graph_io.load_edge_list(edges, directed=False).num_edges, 2 * g.num_edges)
+            d = graph_io.load_dimacs(dimacs)
+            self.assertEqual(sc.a_star_search_compiled(d, '1', '3'), ['1', '2', '3'])
+
+            g.save(mapped)
+            loaded = graph.CompiledGraph.load(mapped)
+            self.assertEqual(loaded.path, mapped)
+            self.assertEqual(list(loaded.weights), list(g.weights))
+            queries = [(a, b) for a in time_map2 for b in time_map2]
+            self.assertEqual(batch.batch_search(loaded, queries, processes=2), batch.batch_search(g, queries))
+            del loaded
+        finally:
+            for name in (edges, dimacs, mapped):
+                if os.path.exists(name):
+                    os.remove(name)
+            os.rmdir(directory)
+
+    def test35(self):
+        # generators are seeded and their heuristics never overestimate; the report covers every engine
+        for kind, make in bench.GENERATORS.items():
+            time_map, heuristic = make(300, seed=4)
+            self.assertEqual(make(300, seed=4)[0], time_map)
+            g = graph.compile_map(time_map)
+            dist, _ = graph.dijkstra(g, 0)
+            for v in range(0, len(g), 17):
+                self.assertLessEqual(heuristic(g.names[0], g.names[v]), dist[v] + 1e-9)
+        report = bench.run('grid', 100, queries=5, k=2, memory=False)
+        self.assertEqual(set(report['engines']), {'breadth_first_search', 'depth_first_search', 'a_star_search',
+                         'bidirectional_search', 'a_star_search_compiled', 'breadth_first_search_compiled', 'alt'})
+        a_star = report['engines']['a_star_search']
+        self.assertEqual(a_star['solved'], 5)
+        self.assertLessEqual(a_star['latency_ms']['p50'], a_star['latency_ms']['p99'])
+        self.assertEqual(a_star['expansions'], report['engines']['a_star_search_compiled']['expansions'])
+        # without the Unix-only resource module the report just has no peak RSS
+        saved = sys.modules.get('resource')
+        sys.modules['resource'] = None
+        try:
+            self.assertIsNone(bench._max_rss_kb())
+        finally:
+            if saved is None:
+                del sys.modules['resource']
+            else:
+                sys.modules['resource'] = saved
+
+    def test36(self):
+        # ARA* ends on A*'s travel times with a proven bound of 1; out of time before any path it reports none
+        for start in time_map2:
+            for end in time_map2:
+                expected = sc.a_star_search(dis_map2, time_map2, start, end)
+                path, bound = sc.ara_star_search(dis_map2, time_map2, start, end, deadline=5, stats=expand.SearchStats())
+                self.assertEqual(bound, 1.0)
+                self.assertEqual(sum(time_map2[a][b] for a, b in zip(path, path[1:])),
+                                 sum(time_map2[a][b] for a, b in zip(expected, expected[1:])))
+        self.assertEqual(sc.ara_star_search(dis_mapM, time_mapM, 'a', 'p', deadline=-1), (None, float('inf')))
+        stats = expand.SearchStats()
+        path, bound = sc.ara_star_search(dis_mapM, time_mapM, 'a', 'p', weight=5, step=4, stats=stats)
+        self.assertEqual(path, sc.a_star_search(dis_mapM, time_mapM, 'a', 'p'))
+        self.assertEqual(bound, 1.0)
+
+    def test37(self):
+        # HDA* spread over workers still finds optimal paths, and agrees when there is none
+        time_map, heuristic = bench.grid_graph(400, seed=6)
+        g = graph.compile_map(time_map)
+        h = lambda u, t: heuristic(g.names[u], g.names[t])
+        for start, end in [(0, 399), (215, 17), (42, 42)]:
+            stats = expand.SearchStats()
+            path = parallel.hda_star_search(g, start, end, h, processes=3, batch=8, stats=stats)
+            expected = sc.a_star_search_compiled(g, start, end, h)
+            self.assertEqual((path[0], path[-1]), (start, end))
+            self.assertAlmostEqual(sum(time_map[a][b] for a, b in zip(path, path[1:])),
+                                   sum(time_map[a][b] for a, b in zip(expected, expected[1:])))
+            self.assertEqual(stats.expansions > 0, start != end)
+        one_way = graph.compile_map(time_map1)
+        self.assertEqual(parallel.hda_star_search(one_way, 'Beach', 'YWCA', processes=2),
+                         sc.a_star_search_compiled(one_way, 'Beach', 'YWCA'))
+        self.assertIsNone(parallel.hda_star_search(graph.compile_map({'a': {'b': 1}, 'b': {}}), 'b', 'a', processes=2))
+
+    def test38(self):
+        # the server answers pipelined queries by id, shares identical in-flight ones and reports bad ones
+        # on threads and on a process pool alike
+        async def session(routes):
+            listening = await routes.serve_tcp()
+            port = listening.sockets[0].getsockname()[1]
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            requests = [{'id': i, 'start': a, 'end': b} for i, (a, b) in
+                        enumerate([('Campus', 'YWCA'), ('Campus', 'YWCA'), ('Beach', 'Cinema')])]
+            requests.append({'id': 3, 'start': 'Beach', 'end': 'Cinema', 'metric': 'hops'})
+            requests.append({'id': 4, 'start': 'Nowhere', 'end': 'Beach'})
+            writer.write(''.join(json.dumps(r) + '\n' for r in requests).encode())
+            writer.write_eof()
+            answers = [json.loads(line) for line in (await asyncio.wait_for(reader.read(), 60)).decode().splitlines()]
+            writer.close()
+            listening.close()
+            await listening.wait_closed()
+            return {a['id']: a for a in answers}
+        for processes in (0, 1):
+            with self.subTest(processes=processes):
+                routes = server.RouteServer(graph.compile_map(time_map2), processes=processes)
+                try:
+                    answers = asyncio.run(session(routes))
+                finally:
+                    routes.close()
+                self.assertEqual(answers[0]['path'], sc.a_star_search(dis_map2, time_map2, 'Campus', 'YWCA'))
+                self.assertEqual(answers[1]['path'], answers[0]['path'])
+                self.assertEqual([answers[0]['coalesced'], answers[1]['coalesced']], [False, True])
+                self.assertEqual(answers[0]['cost'], sum(time_map2[a][b] for a, b in zip(answers[0]['path'], answers[0]['path'][1:])))
+                self.assertEqual(answers[3]['path'], sc.breadth_first_search(time_map2, 'Beach', 'Cinema'))
+                self.assertIn('Nowhere', answers[4]['error'])
+                self.assertGreaterEqual(answers[2]['timing']['total_ms'], answers[2]['timing']['search_ms'])
+                self.assertEqual((routes.queries, routes.coalesced, routes.errors), (4, 1, 1))
+        # with parallel roads the reported cost is that of the cheap road the search took
+        with tempfile.TemporaryDirectory() as tmp:
+            edges = os.path.join(tmp, 'parallel.txt')
+            with open(edges, 'w') as f:
+                f.write('a b 5\na b 1\nb c 1\n')
+            path, cost, _, _ = server._route(server.load_graph(edges), None, 'time', 'a', 'c')
+        self.assertEqual((path, cost), (['a', 'b', 'c'], 2.0))
+
+    @unittest.skipUnless(dense.np is not None, "the dense backend needs numpy")
+    def test39(self):
+        # the dense backend agrees with the CSR Dijkstra, and its all-pairs table is an exact heuristic
+        for time_map in (time_map2, time_mapM):
+            compiled = graph.compile_map(time_map)
+            matrix = dense.dense_graph(compiled)
+            table = dense.floyd_warshall(matrix, block=3) #several bands even on these small maps
+            for s in range(len(compiled)):
+                expected, _ = graph.dijkstra(compiled, s)
+                self.assertEqual(list(dense.dijkstra(matrix, s)[0]), list(expected))
+                self.assertEqual(list(table.dist[s]), list(expected))
+        cost = lambda path: sum(time_mapM[a][b] for a, b in zip(path, path[1:]))
+        best = cost(sc.a_star_search(dis_mapM, time_mapM, 'a', 'p'))
+        stats = expand.SearchStats()
+        self.assertEqual(cost(dense.dijkstra_search(dense.dense_map(time_mapM), 'a', 'p', stats=stats)), best)
+        self.assertGreater(stats.expansions, 0)
+        table = dense.floyd_warshall_for_map(time_mapM)
+        self.assertEqual(cost(table.route('a', 'p')), best)
+        self.assertEqual(table('a', 'p'), best)
+        exact, usual = expand.SearchStats(), expand.SearchStats()
+        self.assertEqual(cost(sc.a_star_search(table, time_mapM, 'a', 'p', stats=exact)), best)
+        sc.a_star_search(dis_mapM, time_mapM, 'a', 'p', stats=usual)
+        self.assertLessEqual(exact.expansions, usual.expansions)
+        # zero-time roads tie every way round a cycle; route() must still get out of it
+        table = dense.floyd_warshall_for_map({'a': {'b': 0}, 'b': {'a': 0, 'c': 1}, 'c': {}})
+        self.assertEqual(table.route('a', 'c'), ['a', 'b', 'c'])
+        rng = random.Random(5)
+        for _ in range(30):
+            n = rng.randint(2, 12)
+            time_map = {i: {} for i in range(n)}
+            for _ in range(3 * n):
+                time_map[rng.randrange(n)][rng.randrange(n)] = rng.choice([0, 0, 1, 2])
+            compiled = graph.compile_map(time_map)
+            table = dense.floyd_warshall(dense.dense_graph(compiled), block=3)
+            for s in range(n):
+                expected, _ = graph.dijkstra(compiled, s)
+                for t in range(n):
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        path = table.route(compiled.names[s], compiled.names[t])
+                    if expected[t] == math.inf:
+                        self.assertIsNone(path)
+                    else:
+                        self.assertEqual(len(set(path)), len(path))
+                        self.assertEqual(sum(time_map[a][b] for a, b in zip(path, path[1:])), expected[t])
+
 if __name__== "__main__": unittest.main()
@@ -0,0 +1,82 @@
+from array import array
+from collections import deque
+from multiprocessing import Pool
+from graph import CompiledGraph, compile_map, dijkstra
+
+def batch_search(time_map, queries, metric="time", processes=None):
+	"""Answer many (start, end) route queries at once.
+	Queries are grouped by start; each start gets one shortest-path tree, and every end that
+	shares it is read off that tree. metric="time" builds Dijkstra trees (the optimal paths
+	a_star_search finds; when several paths tie, either may be returned), metric="hops" builds
+	BFS trees, which give exactly the paths breadth_first_search returns.
+	time_map may be a dict or a graph.CompiledGraph. With processes > 1 the source groups are
+	spread over a process pool that receives the compiled graph once per worker.
+	Returns one path (list of names) per query, in query order, or None if end is unreachable."""
+	graph = time_map if isinstance(time_map, CompiledGraph) else compile_map(time_map)
+	if metric not in _TREES:
+		raise ValueError("metric must be 'time' or 'hops', not {!r}".format(metric))
+	groups = {}
+	for i, (start, end) in enumerate(queries):
+		groups.setdefault(start, []).append(i)
+
+	jobs = [(start, [queries[i][1] for i in idx]) for start, idx in groups.items()]
+	if processes is not None and processes > 1 and len(jobs) > 1:
+		with Pool(processes, initializer=_init_worker, initargs=(graph, metric)) as pool:
+			answers = pool.map(_worker_answer, jobs)
+	else:
+		answers = [_answer(graph, metric, start, ends) for start, ends in jobs]
+
+	results = [None] * len(queries)
+	for (start, idx), paths in zip(groups.items(), answers):
+		for i, path in zip(idx, paths):
+			results[i] = path
+	return results
+
+
+def _bfs_tree(graph, source):
+	#same discovery order as breadth_first_search, so the parents (and paths) match it
+	parents = array('l', [-1]) * len(graph)
+	seen = bytearray(len(graph))
+	seen[source] = 1
+	offsets, targets = graph.offsets, graph.targets
+	fringe = deque([source])
+	while fringe:
+		u = fringe.popleft()
+		for e in range(offsets[u], offsets[u + 1]):
+			v = targets[e]
+			if not seen[v]:
+				seen[v] = 1
+				parents[v] = u
+				fringe.append(v)
+	return seen, parents
+
+def _dijkstra_tree(graph, source):
+	dist, parents = dijkstra(graph, source)
+	return [d != float('inf') for d in dist], parents
+
+_TREES = {"time": _dijkstra_tree, "hops": _bfs_tree}
+
+def _answer(graph, metric, start, ends):
+	s = graph.ids[start]
+	reached, parents = _TREES[metric](graph, s)
+	paths = []
+	for end in ends:
+		t = graph.ids[end]
+		if not reached[t]:
+			paths.append(None)
+			continue
+		path = [t]
+		while path[-1] != s:
+			path.append(parents[path[-1]]) #retraces path from end to start
+		paths.append(graph.path_names(path[::-1]))
+	return paths
+
+_worker_graph = None
+
+def _init_worker(graph, metric):
+	global _worker_graph
+	_worker_graph = (graph, metric)
+
+def _worker_answer(job):
+	graph, metric = _worker_graph
+	return _answer(graph, metric, *job)
@@ -0,0 +1,190 @@
+"""Benchmarks the searches on seeded synthetic graphs and prints a JSON report.
+Run as: python bench.py [--graph geometric grid scale-free] [--nodes 10000] [--queries 50] [--seed 0]
+	[--landmarks 8] [--ch] [--processes 0] [--no-memory] [--out report.json]
+For every engine the report gives expansions/sec, latency percentiles (ms) and the peak
+memory the queries allocated (tracemalloc, measured in a second pass so it does not skew the
+timings)."""
+import argparse, contextlib, io, json, math, random, sys, time, tracemalloc
+import my_search
+import contraction, graph, landmarks, parallel
+from expand import SearchStats
+
+def geometric_graph(n, degree=6, seed=0):
+	"""n random points in the unit square, with roads both ways between points closer than the
+	radius that gives about degree neighbors each. A road takes its length times a random
+	factor in [1, 1.5), so straight-line distance is a consistent heuristic.
+	Returns (time_map, heuristic) with integer node names."""
+	rng = random.Random(seed)
+	pos = [(rng.random(), rng.random()) for _ in range(n)]
+	radius = math.sqrt(degree / (math.pi * n))
+	cells = {}
+	for u, (x, y) in enumerate(pos):
+		cells.setdefault((int(x / radius), int(y / radius)), []).append(u)
+	time_map = {u: {} for u in range(n)}
+	for (cx, cy), members in cells.items():
+		near = [v for dx in (-1, 0, 1) for dy in (-1, 0, 1) for v in cells.get((cx + dx, cy + dy), ())]
+		for u in members:
+			for v in near:
+				d = math.dist(pos[u], pos[v])
+				if u < v and d < radius:
+					time_map[u][v] = d * rng.uniform(1, 1.5)
+					time_map[v][u] = d * rng.uniform(1, 1.5)
+	return time_map, lambda node, end: math.dist(pos[node], pos[end])
+
+def grid_graph(n, seed=0):
+	"""A square 4-connected grid of about n intersections; each road takes a random time in
+	[1, 2), so Manhattan distance in blocks is a consistent heuristic."""
+	rng = random.Random(seed)
+	side = max(math.isqrt(n), 1)
+	time_map = {}
+	for r in range(side):
+		for c in range(side):
+			roads = time_map[r * side + c] = {}
+			for rr, cc in ((r - 1, c), (r, c - 1), (r, c + 1), (r + 1, c)):
+				if 0 <= rr < side and 0 <= cc < side:
+					roads[rr * side + cc] = rng.uniform(1, 2)
+	return time_map, lambda node, end: abs(node // side - end // side) + abs(node % side - end % side)
+
+def scale_free_graph(n, m=3, seed=0):
+	"""Barabasi-Albert preferential attachment: each new node links to m existing ones picked
+	in proportion to their degree, with roads both ways taking a random time in [1, 10).
+	There is no geometry to bound travel time with, so the heuristic is 0."""
+	rng = random.Random(seed)
+	time_map = {u: {} for u in range(n)}
+	ends = list(range(min(m, n))) #every node once per road end, so choice() is degree-weighted
+	for u in range(m, n):
+		for v in {rng.choice(ends) for _ in range(m)}:
+			time_map[u][v] = rng.uniform(1, 10)
+			time_map[v][u] = rng.uniform(1, 10)
+			ends += (u, v)
+	return time_map, lambda node, end: 0
+
+GENERATORS = {"geometric": geometric_graph, "grid": grid_graph, "scale-free": scale_free_graph}
+
+def engines(time_map, heuristic, k=8, ch=False, seed=0, processes=0):
+	"""Returns (searches, setup): searches maps engine name -> search(start, end, stats) for
+	every engine worth timing on this graph, setup maps it to the seconds spent preparing it
+	(reversing, compiling, k landmarks for ALT, contraction when ch is set). With processes > 1
+	HDA* runs on that many workers too."""
+	found, setup = {}, {}
+	found["breadth_first_search"] = lambda s, t, stats: my_search.breadth_first_search(time_map, s, t, stats=stats)
+	found["depth_first_search"] = lambda s, t, stats: my_search.depth_first_search(time_map, s, t, stats=stats)
+	found["a_star_search"] = lambda s, t, stats: my_search.a_star_search(heuristic, time_map, s, t, stats=stats)
+	started = time.perf_counter()
+	reverse = my_search.reverse_time_map(time_map)
+	setup["bidirectional_search"] = time.perf_counter() - started
+	found["bidirectional_search"] = lambda s, t, stats: my_search.bidirectional_search(heuristic, time_map, s, t, reverse, stats=stats)
+
+	started = time.perf_counter()
+	compiled = graph.compile_map(time_map)
+	compiling = time.perf_counter() - started
+	names = compiled.names
+	by_id = lambda u, t: heuristic(names[u], names[t])
+	found["a_star_search_compiled"] = lambda s, t, stats: my_search.a_star_search_compiled(compiled, s, t, by_id, stats=stats)
+	found["breadth_first_search_compiled"] = lambda s, t, stats: my_search.breadth_first_search_compiled(compiled, s, t, stats=stats)
+	setup["a_star_search_compiled"] = setup["breadth_first_search_compiled"] = compiling
+	if k:
+		started = time.perf_counter()
+		index = landmarks.build_landmarks(compiled, k, seed)
+		setup["alt"] = compiling + time.perf_counter() - started
+		found["alt"] = lambda s, t, stats: my_search.a_star_search_compiled(compiled, s, t, index.lower_bound, stats=stats)
+	if processes > 1:
+		found["hda_star_search"] = lambda s, t, stats: parallel.hda_star_search(compiled, s, t, by_id, processes, stats=stats)
+		setup["hda_star_search"] = compiling
+	if ch:
+		started = time.perf_counter()
+		hierarchy = contraction.build_hierarchy(compiled)
+		setup["contraction_hierarchy"] = compiling + time.perf_counter() - started
+		found["contraction_hierarchy"] = lambda s, t, stats: hierarchy.query(s, t, stats=stats)
+	return found, setup
+
+def percentile(values, p):
+	"""Nearest-rank percentile of a sorted list."""
+	if not values:
+		return None
+	return values[min(len(values) - 1, max(0, math.ceil(p / 100 * len(values)) - 1))]
+
+def measure(search, queries, memory=True):
+	"""Run search over queries and summarize it. Output from the searches is swallowed, since
+	unreachable queries print "No solution found"."""
+	latencies, expansions, peak_frontier, solved = [], 0, 0, 0
+	with contextlib.redirect_stdout(io.StringIO()):
+		for start, end in queries:
+			stats = SearchStats()
+			if search(start, end, stats) is not None:
+				solved += 1
+			latencies.append(stats.wall_time)
+			expansions += stats.expansions
+			peak_frontier = max(peak_frontier, stats.peak_frontier)
+		peak_memory = None
+		if memory:
+			tracemalloc.start()
+			for start, end in queries:
+				tracemalloc.reset_peak()
+				search(start, end, SearchStats())
+				peak_memory = max(peak_memory or 0, tracemalloc.get_traced_memory()[1])
+			tracemalloc.stop()
+	seconds = sum(latencies)
+	latencies.sort()
+	return {
+		"queries": len(queries),
+		"solved": solved,
+		"expansions": expansions,
+		"expansions_per_sec": expansions / seconds if seconds else None,
+		"latency_ms": {"p50": percentile(latencies, 50) * 1000, "p90": percentile(latencies, 90) * 1000,
+			"p99": percentile(latencies, 99) * 1000, "max": latencies[-1] * 1000} if latencies else None,
+		"peak_frontier": peak_frontier,
+		"peak_memory_bytes": peak_memory,
+	}
+
+def run(kind, nodes, queries=50, seed=0, k=8, ch=False, memory=True, processes=0):
+	"""Build one seeded graph and benchmark every engine on the same random queries."""
+	started = time.perf_counter()
+	time_map, heuristic = GENERATORS[kind](nodes, seed=seed)
+	built = time.perf_counter() - started
+	rng = random.Random(seed)
+	names = list(time_map)
+	pairs = [(rng.choice(names), rng.choice(names)) for _ in range(queries)]
+	found, setup = engines(time_map, heuristic, k, ch, seed, processes)
+	report = {
+		"graph": kind, "seed": seed, "nodes": len(time_map),
+		"edges": sum(len(roads) for roads in time_map.values()),
+		"build_seconds": built, "engines": {},
+	}
+	for name, search in found.items():
+		report["engines"][name] = measure(search, pairs, memory)
+		report["engines"][name]["setup_seconds"] = setup.get(name, 0.0)
+	return report
+
+def _max_rss_kb():
+	#resource only exists on Unix; elsewhere the report just leaves the peak RSS out
+	try:
+		import resource
+	except ImportError:
+		return None
+	return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+	parser.add_argument("--graph", nargs="+", default=sorted(GENERATORS), choices=sorted(GENERATORS))
+	parser.add_argument("--nodes", type=int, default=10000)
+	parser.add_argument("--queries", type=int, default=50)
+	parser.add_argument("--seed", type=int, default=0)
+	parser.add_argument("--landmarks", type=int, default=8, help="landmarks for the ALT engine (0 skips it)")
+	parser.add_argument("--ch", action="store_true", help="also build and time a contraction hierarchy (slow to build)")
+	parser.add_argument("--processes", type=int, default=0, help="also time HDA* on this many worker processes")
+	parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc pass")
+	parser.add_argument("--out", help="write the report here instead of stdout")
+	args = parser.parse_args()
+
+	reports = [run(kind, args.nodes, args.queries, args.seed, args.landmarks, args.ch, not args.no_memory,
+		args.processes) for kind in args.graph]
+	result = {"python": sys.version.split()[0], "max_rss_kb": _max_rss_kb(), "runs": reports}
+	if args.out:
+		with open(args.out, "w") as f:
+			json.dump(result, f, indent=2)
+	else:
+		print(json.dumps(result, indent=2))
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,271 @@
+import heapq, struct
+from array import array
+from expand import expand_compiled, instrumented
+from graph import CompiledGraph, compile_map
+
+_MAGIC = b"CH01"
+_INF = float('inf')
+
+class ContractionHierarchy:
+	"""Contraction hierarchy over a graph.CompiledGraph, for graphs that are queried far more
+	often than they change. Every node has a rank; up holds the edges (original or shortcut)
+	that lead from a node to a higher-ranked one, and down holds, for each node, the edges that
+	arrive at it from higher-ranked nodes, flipped so both query searches only ever climb.
+	up_middles / down_middles give the node a shortcut was made by bypassing (-1 for a real road),
+	which is all query() needs to unpack a shortcut back into the roads it stands for."""
+	def __init__(self, graph, rank, up, up_middles, down, down_middles):
+		self.graph = graph
+		self.rank = rank
+		self.up, self.up_middles = up, up_middles
+		self.down, self.down_middles = down, down_middles
+
+	def __repr__(self):
+		return "ContractionHierarchy({} nodes, {} upward and {} downward edges)".format(
+			len(self.graph), self.up.num_edges, self.down.num_edges)
+
+	@instrumented
+	def query(self, start, end, stats=None):
+		"""Shortest travel-time path from start to end as a list of landmark names, like
+		a_star_search returns, or None if end cannot be reached. Runs an upward Dijkstra from
+		each end, alternating on the smaller key, and stops a side once its key reaches the best
+		meeting cost found. A node that a higher-ranked one on its own side already reaches more
+		cheaply is stalled instead of expanded; every other settled node goes through
+		expand_compiled()."""
+		s, t = self.graph.ids[start], self.graph.ids[end]
+		graphs = (self.up, self.down)
+		dist = ({s: 0.0}, {t: 0.0})
+		parents = ({s: -1}, {t: -1})
+		open = ([(0.0, s)], [(0.0, t)])
+		best, meet = _INF, -1
+
+		while open[0] or open[1]:
+			side = 0 if open[0] and (not open[1] or open[0][0][0] <= open[1][0][0]) else 1
+			d, u = heapq.heappop(open[side])
+			if d > dist[side][u]: #stale
+				continue
+			if d >= best: #nothing left on this side can improve the meeting point
+				del open[side][:]
+				continue
+			if u in dist[1 - side] and d + dist[1 - side][u] < best:
+				best, meet = d + dist[1 - side][u], u
+			if self._stalled(u, d, graphs[1 - side], dist[side]):
+				continue
+			g = graphs[side]
+			targets, weights = g.targets, g.weights
+			for e in expand_compiled(u, g, stats):
+				v = targets[e]
+				nd = d + weights[e]
+				if nd < dist[side].get(v, _INF):
+					dist[side][v] = nd
+					parents[side][v] = u
+					heapq.heappush(open[side], (nd, v))
+			if stats is not None:
+				stats.frontier(len(open[0]) + len(open[1]))
+		if meet == -1:
+			print("No solution found")
+			return
+
+		climb = [meet]
+		while parents[0][climb[-1]] != -1:
+			climb.append(parents[0][climb[-1]]) #retraces the upward search back to start
+		climb.reverse()
+		while parents[1][climb[-1]] != -1:
+			climb.append(parents[1][climb[-1]]) #and the downward one on to end
+		path = [s]
+		for a, b in zip(climb, climb[1:]):
+			self._unpack(a, b, path)
+		return self.graph.path_names(path)
+
+	def _stalled(self, u, d, other, dist):
+		#stall-on-demand: a higher-ranked node already reaches u more cheaply, so u's
+		#tentative distance is not a shortest one and nothing above it needs relaxing from here
+		targets, weights = other.targets, other.weights
+		for e in range(other.offsets[u], other.offsets[u + 1]):
+			if dist.get(targets[e], _INF) + weights[e] < d:
+				return True
+		return False
+
+	def _middle(self, a, b):
+		#the node bypassed by edge a -> b, stored on whichever end has the lower rank
+		if self.rank[a] < self.rank[b]:
+			g, middles, lo, hi = self.up, self.up_middles, a, b
+		else:
+			g, middles, lo, hi = self.down, self.down_middles, b, a
+		for e in range(g.offsets[lo], g.offsets[lo + 1]):
+			if g.targets[e] == hi:
+				return middles[e]
+		raise KeyError((a, b))
+
+	def _unpack(self, a, b, path):
+		#appends the real roads behind edge a -> b, leaving out a itself
+		stack = [(a, b)]
+		while stack:
+			a, b = stack.pop()
+			mid = self._middle(a, b)
+			if mid == -1:
+				path.append(b)
+			else:
+				stack.append((mid, b))
+				stack.append((a, mid))
+
+	def save(self, path):
+		"""Write the hierarchy to path so later processes can load() it instead of rebuilding."""
+		with open(path, "wb") as f:
+			f.write(_MAGIC)
+			f.write(struct.pack("<qqq", len(self.graph), self.up.num_edges, self.down.num_edges))
+			array('q', self.rank).tofile(f)
+			for g, middles in ((self.up, self.up_middles), (self.down, self.down_middles)):
+				array('q', g.offsets).tofile(f)
+				array('q', g.targets).tofile(f)
+				g.weights.tofile(f)
+				array('q', middles).tofile(f)
+
+	@classmethod
+	def load(cls, path, graph):
+		"""Read a hierarchy written by save(); graph must be the one it was built from."""
+		def read(f, typecode, count):
+			out = array(typecode)
+			out.fromfile(f, count)
+			return out if typecode == 'd' else array('l', out)
+
+		with open(path, "rb") as f:
+			if f.read(4) != _MAGIC:
+				raise ValueError("{} is not a contraction hierarchy".format(path))
+			n, m_up, m_down = struct.unpack("<qqq", f.read(24))
+			if n != len(graph):
+				raise ValueError("hierarchy was built for {} nodes, graph has {}".format(n, len(graph)))
+			rank = read(f, 'q', n)
+			halves = []
+			for m in (m_up, m_down):
+				offsets, targets, weights = read(f, 'q', n + 1), read(f, 'q', m), read(f, 'd', m)
+				halves += [CompiledGraph(graph.names, offsets, targets, weights), read(f, 'q', m)]
+		return cls(graph, rank, *halves)
+
+
+def build_hierarchy(graph, settle_limit=64, simulate_limit=256, hop_limit=5):
+	"""Contract the nodes of graph one at a time, cheapest first, and return the hierarchy.
+	A node's cost is twice its edge difference (shortcuts it would add minus edges it would
+	remove) plus how many of its neighbors are already contracted and how deep the contracted
+	levels below it go, which keeps the order spread out. Costs are updated lazily: contracting
+	a node only bumps the cheap terms of its neighbors, and a node's shortcuts are simulated
+	again when it reaches the front of the queue; if it is no longer the cheapest it goes back
+	in, otherwise that same simulation is used to contract it. Contracting v adds a
+	shortcut u -> w for every u -> v -> w unless a witness search from u that avoids v finds
+	a path at least as short. Witness searches give up after settle_limit nodes or past
+	hop_limit roads; that only costs extra shortcuts, never wrong answers. A node with more
+	than simulate_limit in/out neighbor pairs is costed as if each pair needed a shortcut,
+	which leaves the hubs of scale-free graphs for last without simulating them over and over.
+	Parallel edges keep the cheapest road.
+	The build is pure Python and meant for road-like graphs: a 100k-node geometric graph from
+	bench.py builds in about a minute (10k nodes in about 3 s) and is then queried about 30x
+	faster than a_star_search_compiled. Uniform grids and scale-free graphs fill in with
+	shortcuts: 10k nodes take about 30 s as a grid and about 6 minutes as a scale-free graph."""
+	n = len(graph)
+	out = [{} for _ in range(n)] #node -> {neighbor: (weight, middle)} among uncontracted nodes
+	inn = [{} for _ in range(n)]
+	for u in range(n):
+		for v, w in graph.edges(u):
+			if v != u and w < out[u].get(v, (_INF,))[0]:
+				out[u][v] = inn[v][u] = (w, -1)
+
+	def shortcuts(v):
+		found = []
+		for u, (w_in, _) in inn[v].items():
+			wanted = {w: w_in + w_out for w, (w_out, _) in out[v].items() if w != u}
+			if not wanted:
+				continue
+			limit = max(wanted.values())
+			dist = {u: 0.0}
+			open = [(0.0, 0, u)]
+			settled, left = 0, len(wanted)
+			while open and settled < settle_limit:
+				d, hops, x = heapq.heappop(open)
+				if d > dist[x]:
+					continue
+				if d > limit:
+					break
+				settled += 1
+				if x in wanted:
+					left -= 1
+					if not left: #every target settled: nothing further can be a witness
+						break
+				if hops == hop_limit:
+					continue
+				for y, (w, _) in out[x].items():
+					w += d
+					if w <= limit and y != v and w < dist.get(y, _INF): #longer than limit cannot witness anything
+						dist[y] = w
+						heapq.heappush(open, (w, hops + 1, y))
+			found += [(u, w, cost) for w, cost in wanted.items() if dist.get(w, _INF) > cost]
+		return found
+
+	def simulate(v):
+		#simulating a hub costs a witness search per in-edge; past simulate_limit pairs assume
+		#every pair needs a shortcut instead, and leave the real shortcuts for contraction time
+		pairs = len(inn[v]) * len(out[v])
+		if pairs > simulate_limit:
+			estimate[v] = pairs
+			return None
+		found = shortcuts(v)
+		estimate[v] = len(found)
+		return found
+
+	def priority(v):
+		return 2 * (estimate[v] - len(inn[v]) - len(out[v])) + contracted_neighbors[v] + depth[v]
+
+	rank = array('l', [-1]) * n
+	contracted_neighbors = array('l', [0]) * n
+	depth = array('l', [0]) * n #how many contraction levels lie below the node
+	estimate = array('l', [0]) * n #shortcuts the node needed when last simulated
+	for v in range(n):
+		simulate(v)
+	current = [priority(v) for v in range(n)]
+	up_edges, down_edges = [None] * n, [None] * n
+	queue = [(p, v) for v, p in enumerate(current)]
+	heapq.heapify(queue)
+	level = 0
+	while queue:
+		p, v = heapq.heappop(queue)
+		if rank[v] != -1 or p != current[v]: #stale
+			continue
+		added = simulate(v)
+		current[v] = priority(v)
+		if queue and current[v] > queue[0][0]: #lazy update: no longer the cheapest
+			heapq.heappush(queue, (current[v], v))
+			continue
+		if added is None:
+			added = shortcuts(v)
+		rank[v] = level
+		level += 1
+		up_edges[v], down_edges[v] = out[v], inn[v]
+		neighbors = set(inn[v]) | set(out[v])
+		for u in inn[v]:
+			del out[u][v]
+		for w in out[v]:
+			del inn[w][v]
+		for u, w, cost in added:
+			if cost < out[u].get(w, (_INF,))[0]:
+				out[u][w] = inn[w][u] = (cost, v)
+		out[v] = inn[v] = None
+		for x in neighbors: #no simulation here: the shortcut estimate is refreshed when x is popped
+			contracted_neighbors[x] += 1
+			depth[x] = max(depth[x], depth[v] + 1)
+			current[x] = priority(x)
+			heapq.heappush(queue, (current[x], x))
+	return ContractionHierarchy(graph, rank, *_freeze(graph, up_edges), *_freeze(graph, down_edges))
+
+def _freeze(graph, edges):
+	#per-node {neighbor: (weight, middle)} dicts -> a CompiledGraph plus its middles array
+	offsets = array('l', [0])
+	targets, weights, middles = array('l'), array('d'), array('l')
+	for adjacent in edges:
+		for v, (w, mid) in adjacent.items():
+			targets.append(v)
+			weights.append(w)
+			middles.append(mid)
+		offsets.append(len(targets))
+	return CompiledGraph(graph.names, offsets, targets, weights), middles
+
+def build_hierarchy_for_map(time_map, settle_limit=64, simulate_limit=256, hop_limit=5):
+	"""build_hierarchy() straight from a dict time_map."""
+	return build_hierarchy(compile_map(time_map), settle_limit, simulate_limit, hop_limit)
@@ -0,0 +1,180 @@
+"""Dense-matrix backend: a time_map as an N x N NumPy matrix with inf where there is no road.
+Small and mid-sized maps are already full N x N tables, and on those a vectorized Dijkstra
+(one row operation per settled node) and an all-pairs Floyd-Warshall beat the per-edge Python
+loops. The all-pairs table is an exact heuristic: it can stand in for a dis_map anywhere, or
+answer every route in the map by lookup. Needs numpy; without it the module still imports but
+building a DenseGraph raises ImportError."""
+from expand import count_expansion, instrumented
+from graph import compile_map
+
+try:
+	import numpy as np
+except ImportError: #optional: only this backend needs it
+	np = None
+
+class DenseGraph:
+	"""names[u] is the landmark with node id u and matrix[u, v] the travel time of road u -> v,
+	inf if there is none. Ids follow graph.compile_map(), so a DenseGraph built from a
+	CompiledGraph uses the same ids as it."""
+	def __init__(self, names, matrix):
+		if np is None:
+			raise ImportError("the dense backend needs numpy")
+		self.names = names
+		self.ids = {name: i for i, name in enumerate(names)}
+		self.matrix = matrix
+
+	def __len__(self):
+		return len(self.names)
+
+	def __repr__(self):
+		return "DenseGraph({} nodes, {} edges)".format(len(self.names), int(np.isfinite(self.matrix).sum()))
+
+
+class DistanceTable:
+	"""All-pairs shortest travel times over a DenseGraph: dist[u, t] is the time from u to t
+	(inf if t cannot be reached). Called with landmark names it is an exact dis_map for
+	a_star_search and friends; lower_bound takes node ids for a_star_search_compiled."""
+	def __init__(self, graph, dist):
+		self.graph = graph
+		self.dist = dist
+
+	def __repr__(self):
+		return "DistanceTable({} nodes)".format(len(self.graph))
+
+	def __call__(self, node, end):
+		ids = self.graph.ids
+		return float(self.dist[ids[node], ids[end]])
+
+	def lower_bound(self, u, t):
+		return float(self.dist[u, t])
+
+	def route(self, start, end):
+		"""Shortest travel-time path from start to end by table lookup, as a list of landmark
+		names, or None if end cannot be reached. From each node u it takes a road u -> v with
+		time(u, v) + dist[v, end] equal to dist[u, end] (up to rounding), one vectorized row per
+		node and no search. Roads back onto nodes already entered are skipped and a dead end
+		backs up to the next such road, so ties around a cycle of zero-time roads cannot loop:
+		each node is entered at most once."""
+		names, matrix, dist = self.graph.names, self.graph.matrix, self.dist
+		u, t = self.graph.ids[start], self.graph.ids[end]
+		if dist[u, t] == np.inf:
+			print("No solution found")
+			return
+		column = dist[:, t]
+		entered = np.zeros(len(names), dtype=bool)
+		entered[u] = True
+		path, options = [u], [_next_roads(matrix[u] + column, column[u])]
+		while path[-1] != t:
+			if not options[-1]: #every road on from here leads back onto the path
+				path.pop()
+				options.pop()
+				continue
+			v = options[-1].pop()
+			if entered[v]:
+				continue
+			entered[v] = True
+			path.append(v)
+			options.append(_next_roads(matrix[v] + column, column[v]))
+		return [names[u] for u in path]
+
+def _next_roads(through, best):
+	#the nodes after u on its shortest routes, allowing for rounding, best last so pop() takes it
+	near = np.flatnonzero(through <= best * (1 + 1e-9))
+	return near[np.argsort(-through[near], kind="stable")].tolist()
+
+
+def dense_graph(graph):
+	"""A DenseGraph from a graph.CompiledGraph; parallel roads keep the cheapest."""
+	if np is None:
+		raise ImportError("the dense backend needs numpy")
+	n = len(graph)
+	offsets = np.asarray(graph.offsets, dtype=np.int64)
+	sources = np.repeat(np.arange(n), np.diff(offsets))
+	matrix = np.full((n, n), np.inf)
+	np.minimum.at(matrix, (sources, np.asarray(graph.targets, dtype=np.int64)), np.asarray(graph.weights, dtype=float))
+	return DenseGraph(list(graph.names), matrix)
+
+def dense_map(time_map):
+	"""A DenseGraph straight from a dict time_map."""
+	return dense_graph(compile_map(time_map))
+
+
+def _dijkstra(graph, source, end, stats):
+	#one argmin over the unsettled nodes and one vectorized relaxation of a whole row per step;
+	#a search (end given) counts its expansions, preprocessing (end None) does not
+	matrix = graph.matrix
+	n = len(matrix)
+	dist = np.full(n, np.inf)
+	parents = np.full(n, -1, dtype=np.int64)
+	settled = np.zeros(n, dtype=bool)
+	open = np.full(n, np.inf) #dist of reached but unsettled nodes, inf for everything else
+	dist[source] = open[source] = 0.0
+	for _ in range(n):
+		u = int(np.argmin(open))
+		if open[u] == np.inf: #nothing left that can be reached
+			break
+		open[u] = np.inf
+		settled[u] = True
+		if u == end:
+			break
+		row = matrix[u]
+		if end is not None:
+			count_expansion(u, np.flatnonzero(row != np.inf), stats)
+		relaxed = dist[u] + row
+		better = (relaxed < dist) & ~settled
+		dist[better] = open[better] = relaxed[better]
+		parents[better] = u
+		if stats is not None:
+			stats.frontier(int(np.count_nonzero(open != np.inf)))
+	return dist, parents
+
+def dijkstra(graph, source):
+	"""One-to-all shortest travel times from source (a node id) over a DenseGraph, like
+	graph.dijkstra(): returns (dist, parents) as NumPy arrays indexed by node id, with inf
+	and -1 for unreachable nodes."""
+	return _dijkstra(graph, source, None, None)
+
+@instrumented
+def dijkstra_search(graph, start, end, stats=None):
+	"""Shortest travel-time path from start to end over a DenseGraph as a list of landmark
+	names, or None if end cannot be reached. Stops as soon as end is settled."""
+	s, t = graph.ids[start], graph.ids[end]
+	dist, parents = _dijkstra(graph, s, t, stats)
+	if dist[t] == np.inf:
+		print("No solution found")
+		return
+	path = [t]
+	while parents[path[-1]] != -1:
+		path.append(int(parents[path[-1]])) #retraces path from end to start
+	return [graph.names[u] for u in reversed(path)]
+
+def floyd_warshall(graph, block=32):
+	"""All-pairs shortest travel times over a DenseGraph as a DistanceTable.
+	Blocked Floyd-Warshall: for each band of block intermediate nodes, close the diagonal
+	tile, then the row and column panels through it, then update the rest of the matrix with
+	the min-plus product of the two panels, a few rows at a time so the temporary stays around
+	64k entries and in cache. Every step is a whole-array NumPy operation."""
+	dist = graph.matrix.copy()
+	n = len(dist)
+	np.fill_diagonal(dist, np.minimum(dist.diagonal(), 0.0))
+	for k0 in range(0, n, block):
+		k1 = min(k0 + block, n)
+		tile = dist[k0:k1, k0:k1] #views: updating them updates dist
+		for k in range(k1 - k0):
+			np.minimum(tile, tile[:, k, None] + tile[None, k, :], out=tile)
+		row, column = dist[k0:k1, :], dist[:, k0:k1]
+		for k in range(k1 - k0):
+			np.minimum(row, tile[:, k, None] + row[None, k, :], out=row)
+			np.minimum(column, column[:, k, None] + tile[None, k, :], out=column)
+		#the panels are final for this band, so the rest is one min-plus product; rewriting
+		#the panels themselves on the way changes nothing
+		rows = max(1, (1 << 16) // ((k1 - k0) * n))
+		for i0 in range(0, n, rows):
+			i1 = min(i0 + rows, n)
+			through = (column[i0:i1, :, None] + row[None, :, :]).min(axis=1)
+			np.minimum(dist[i0:i1], through, out=dist[i0:i1])
+	return DistanceTable(graph, dist)
+
+def floyd_warshall_for_map(time_map, block=32):
+	"""floyd_warshall() straight from a dict time_map."""
+	return floyd_warshall(dense_map(time_map), block)
@@ -1,7 +1,81 @@
+import functools, inspect, time
+
 expand_count = 0
 
-def expand(node, _map):
+class SearchStats:
+	"""Per-search instrumentation. Hand one to a search as stats=... and its expand() calls
+	count into it instead of printing and bumping the module-global expand_count, so searches
+	running side by side can each be measured.
+	trace, if given, is called as trace(event, node) for every "expand" event; leave it None
+	and nothing is emitted. reexpansions is only filled in by the memory-bounded searches, which
+	may expand the same node more than once."""
+	def __init__(self, trace=None):
+		self.expansions = 0
+		self.generated = 0
+		self.peak_frontier = 0
+		self.reexpansions = 0
+		self.wall_time = 0.0
+		self.trace = trace
+
+	def __repr__(self):
+		return "SearchStats(expansions={}, generated={}, peak_frontier={}, reexpansions={}, wall_time={:.6f})".format(
+			self.expansions, self.generated, self.peak_frontier, self.reexpansions, self.wall_time)
+
+	def frontier(self, size):
+		if size > self.peak_frontier:
+			self.peak_frontier = size
+
+	def _expanded(self, node, successors):
+		self.expansions += 1
+		self.generated += successors
+		if self.trace is not None:
+			self.trace("expand", node)
+
+def instrumented(search):
+	"""Decorator for searches taking a stats argument: adds the call's wall time to stats.wall_time.
+	stats is picked up whether it is passed by keyword or by position."""
+	position = list(inspect.signature(search).parameters).index("stats")
+	@functools.wraps(search)
+	def timed(*args, **kwargs):
+		stats = args[position] if len(args) > position else kwargs.get("stats")
+		if stats is None:
+			return search(*args, **kwargs)
+		start = time.perf_counter()
+		try:
+			return search(*args, **kwargs)
+		finally:
+			stats.wall_time += time.perf_counter() - start
+	return timed
+
+def expand(node, _map, stats=None):
 	global expand_count
+	if stats is not None:
+		out = [next for next in _map[node] if _map[node][next] is not None]
+		stats._expanded(node, len(out))
+		return out
 	print(node)
 	expand_count = expand_count + 1
 	return [next for next in _map[node] if _map[node][next] is not None]
+
+
+def count_expansion(node, successors, stats=None):
+	"""The counting half of expand(), for searches that generate their own successors
+	(e.g. fourgrid's jump point search): records one expansion of node and returns successors."""
+	global expand_count
+	if stats is not None:
+		stats._expanded(node, len(successors))
+	else:
+		expand_count = expand_count + 1
+	return successors
+
+
+def expand_compiled(node, graph, stats=None):
+	"""expand() for a graph.CompiledGraph: counts the expansion like expand() does and
+	returns the range of edge slots holding node's out-edges. It does not echo the node."""
+	return count_expansion(node, range(graph.offsets[node], graph.offsets[node + 1]), stats)
+
+
+def expand_grid(cell, grid, stats=None):
+	"""expand() for a fourgrid.FourGrid: counts the expansion and returns the flat indices of
+	the open cells next to cell. It does not echo the cell."""
+	return count_expansion(cell, grid.neighbors(cell), stats)
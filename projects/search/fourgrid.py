@@ -1,24 +1,263 @@
+import heapq, math, random
+from array import array
+from expand import count_expansion, expand_grid, instrumented
+
 class FourGrid(object):
 	"""A random (solvable) four-connected grid. If you're so inclined, you can implement A* for this class as well.
 	The distance between any two cells (if they are connected) is one. We recommend using euclidean distance (or
 	something similar) for your heuristic.
-	You _do not_ need to implement this for this homework; it's just here if you're gung-ho."""
-	def __init__(self, rows, cols, seed=0):
+	Cells live in one packed bytearray (row-major, 1 = wall) rather than as per-cell objects, and neighbors are
+	computed on the fly, so a 2000x2000 grid costs 4 MB. A random monotone corridor from the top-left corner
+	(self.start) to the bottom-right one (self.goal) is carved out, so the two are always connected."""
+	def __init__(self, rows, cols, seed=0, density=0.3):
 		super(FourGrid, self).__init__()
+		if rows < 1 or cols < 1: #start and goal need at least one cell
+			raise ValueError("a FourGrid needs at least one row and one column, not {}x{}".format(rows, cols))
 		self.rows, self.cols = rows, cols
 		self.seed = seed
-	
+		self.density = density
+		self.start, self.goal = (0, 0), (rows - 1, cols - 1)
+
+		rng = random.Random(seed)
+		cutoff = int(density * 256)
+		walls = bytes(1 if b < cutoff else 0 for b in range(256))
+		self.cells = bytearray(rng.randbytes(rows * cols).translate(walls))
+		r, c = self.start
+		self.cells[0] = 0
+		while (r, c) != self.goal: #carve the corridor that makes the grid solvable
+			if c == cols - 1 or (r < rows - 1 and rng.random() < 0.5):
+				r += 1
+			else:
+				c += 1
+			self.cells[r * cols + c] = 0
+
 	def __repr__(self):
-		return ""
+		return "FourGrid({}, {}, seed={}, density={})".format(self.rows, self.cols, self.seed, self.density)
 
 	def __str__(self):
-		return ""
+		return "\n".join(
+			self.cells[r * self.cols:(r + 1) * self.cols].translate(_GLYPHS).decode() for r in range(self.rows))
 
 	def __getitem__(self, key):
 		"""Pass in a (row, col) tuple to get a particular cell in this map."""
-		return None
+		row, col = key
+		if not (0 <= row < self.rows and 0 <= col < self.cols):
+			raise IndexError("cell {} is outside a {}x{} grid".format(key, self.rows, self.cols))
+		return _GridNode(row, col, self.cells[row * self.cols + col] == 0)
+
+	def index(self, row, col):
+		return row * self.cols + col
+
+	def cell(self, index):
+		return divmod(index, self.cols)
+
+	def passable(self, row, col):
+		return 0 <= row < self.rows and 0 <= col < self.cols and self.cells[row * self.cols + col] == 0
+
+	def neighbors(self, index):
+		"""Flat indices of the open cells next to index, in up/left/right/down order."""
+		cells, cols = self.cells, self.cols
+		col = index % cols
+		out = []
+		if index >= cols and not cells[index - cols]:
+			out.append(index - cols)
+		if col > 0 and not cells[index - 1]:
+			out.append(index - 1)
+		if col < cols - 1 and not cells[index + 1]:
+			out.append(index + 1)
+		if index + cols < len(cells) and not cells[index + cols]:
+			out.append(index + cols)
+		return out
+
+_GLYPHS = bytes.maketrans(b"\x00\x01", b".#")
 
 class _GridNode(object):
-	"""docstring for _GridNode"""
-	def __init__(self):
-		super(_GridNode, self).__init__()
\ No newline at end of file
+	"""A read-only view of one cell, built on demand by FourGrid.__getitem__."""
+	__slots__ = ("row", "col", "passable")
+
+	def __init__(self, row, col, passable):
+		super(_GridNode, self).__init__()
+		self.row, self.col = row, col
+		self.passable = passable
+
+	def __repr__(self):
+		return "_GridNode({}, {}, {})".format(self.row, self.col, "open" if self.passable else "wall")
+
+
+def manhattan(r1, c1, r2, c2):
+	return abs(r1 - r2) + abs(c1 - c2)
+
+def euclidean(r1, c1, r2, c2):
+	return math.hypot(r1 - r2, c1 - c2)
+
+HEURISTICS = {"manhattan": manhattan, "euclidean": euclidean}
+
+
+@instrumented
+def a_star_search(grid, start=None, end=None, heuristic="manhattan", stats=None):
+	"""A* directly on a FourGrid with unit step costs. start/end are (row, col) and default to
+	grid.start/grid.goal; heuristic is "manhattan", "euclidean" or a callable (r1, c1, r2, c2).
+	Returns the path as a list of (row, col) cells, or None when end cannot be reached.
+	Ties on f go to the lower h, like my_search.a_star_search. Per-cell state is kept in flat
+	arrays (4-byte g, one parent-direction byte) so memory stays linear in the grid size."""
+	start = grid.start if start is None else start
+	end = grid.goal if end is None else end
+	h = HEURISTICS.get(heuristic, heuristic)
+	cols = grid.cols
+	s, t = grid.index(*start), grid.index(*end)
+	tr, tc = end
+	if not (grid.passable(*start) and grid.passable(*end)):
+		return None
+
+	gval = array('i', [0]) * len(grid.cells)
+	came = bytearray(len(grid.cells)) #0 = unseen, else the step that reached the cell; bit 7 = closed
+	came[s] = _START
+	hs = h(start[0], start[1], tr, tc)
+	open = [(hs, hs, s)]
+
+	while open:
+		f, hu, u = heapq.heappop(open)
+		if came[u] & _CLOSED or f != gval[u] + hu: #stale entry left behind by a decrease-key
+			continue
+		came[u] |= _CLOSED
+		if u == t:
+			return _retrace(grid, came, t)
+
+		g = gval[u] + 1
+		for v in expand_grid(u, grid, stats):
+			if came[v] & _CLOSED:
+				continue
+			if came[v] and g >= gval[v]:
+				continue
+			gval[v] = g
+			d = v - u
+			came[v] = 1 if d == 1 else 2 if d == -1 else 3 if d > 0 else 4
+			r, c = divmod(v, cols)
+			hv = h(r, c, tr, tc)
+			heapq.heappush(open, (g + hv, hv, v))
+		if stats is not None:
+			stats.frontier(len(open))
+	return None
+
+#parent-direction codes: 1/2 = reached moving right/left, 3/4 = reached moving down/up
+_START = 5
+_CLOSED = 0x80
+
+def _retrace(grid, came, end):
+	cols = grid.cols
+	back = {1: -1, 2: 1, 3: -cols, 4: cols}
+	path = [end]
+	while came[path[-1]] & ~_CLOSED != _START:
+		path.append(path[-1] + back[came[path[-1]] & ~_CLOSED]) #retraces path from end to start
+	return [grid.cell(i) for i in reversed(path)]
+
+
+def _jump_horizontal(grid, i, dx, t):
+	#walk along the row until the goal, a wall, or a cell with a forced vertical neighbor
+	cells, cols = grid.cells, grid.cols
+	col = i % cols
+	while True:
+		col += dx
+		if col < 0 or col >= cols or cells[i + dx]:
+			return -1
+		i += dx
+		if i == t:
+			return i
+		up, down = i - cols, i + cols
+		if up >= 0 and not cells[up] and cells[up - dx]:
+			return i
+		if down < len(cells) and not cells[down] and cells[down - dx]:
+			return i
+
+def _jump_vertical(grid, i, dy, t):
+	#walk along the column; any cell whose row holds a jump point is itself a jump point
+	cells, step = grid.cells, dy * grid.cols
+	while True:
+		i += step
+		if i < 0 or i >= len(cells) or cells[i]:
+			return -1
+		if i == t or _jump_horizontal(grid, i, 1, t) != -1 or _jump_horizontal(grid, i, -1, t) != -1:
+			return i
+
+def _jump_successors(grid, u, arrived, t):
+	#canonical paths go vertical first: after a vertical step anything but reversing is allowed,
+	#after a horizontal step only straight on, or a turn that the wall behind it forces
+	cells, cols = grid.cells, grid.cols
+	if arrived == _START:
+		moves = [(0, 1), (0, -1), (1, 0), (-1, 0)]
+	elif arrived in (1, 2): #reached moving right/left
+		dx = 1 if arrived == 1 else -1
+		moves = [(dx, 0)]
+		for dy in (-1, 1):
+			side = u + dy * cols
+			if 0 <= side < len(cells) and not cells[side] and cells[side - dx]:
+				moves.append((0, dy))
+	else: #reached moving down/up
+		moves = [(0, 1 if arrived == 3 else -1), (1, 0), (-1, 0)]
+	out = []
+	for dx, dy in moves:
+		v = _jump_horizontal(grid, u, dx, t) if dx else _jump_vertical(grid, u, dy, t)
+		if v != -1:
+			out.append((v, 1 if dx == 1 else 2 if dx == -1 else 3 if dy == 1 else 4))
+	return out
+
+@instrumented
+def jump_point_search(grid, start=None, end=None, heuristic="manhattan", stats=None):
+	"""Jump point search for a FourGrid: A* over jump points only. Of all the equally short
+	paths through open ground it only follows the canonical one (vertical moves first), so it
+	returns paths as short as a_star_search's while expanding fewer cells: about 2-4x fewer
+	on random grids from 200x200 to 1000x1000 with 2-20% walls (see jps_benchmark.py), not an
+	order of magnitude, because a_star_search's ties toward the lower h already skip most
+	symmetric detours. Takes the same arguments and returns the full cell-by-cell path like
+	a_star_search does."""
+	start = grid.start if start is None else start
+	end = grid.goal if end is None else end
+	h = HEURISTICS.get(heuristic, heuristic)
+	cols = grid.cols
+	s, t = grid.index(*start), grid.index(*end)
+	tr, tc = end
+	if not (grid.passable(*start) and grid.passable(*end)):
+		return None
+
+	gval = array('i', [0]) * len(grid.cells)
+	parent = array('i', [-1]) * len(grid.cells) #previous jump point
+	came = bytearray(len(grid.cells)) #direction of the jump that reached the cell, as in a_star_search
+	came[s] = _START
+	hs = h(start[0], start[1], tr, tc)
+	open = [(hs, hs, s)]
+
+	while open:
+		f, hu, u = heapq.heappop(open)
+		if came[u] & _CLOSED or f != gval[u] + hu: #stale entry left behind by a decrease-key
+			continue
+		came[u] |= _CLOSED
+		if u == t:
+			return _retrace_jumps(grid, parent, t)
+
+		for v, arrived in count_expansion(u, _jump_successors(grid, u, came[u] & ~_CLOSED, t), stats):
+			if came[v] & _CLOSED:
+				continue
+			g = gval[u] + abs(v - u) // (1 if arrived < 3 else cols)
+			if came[v] and g >= gval[v]:
+				continue
+			gval[v] = g
+			parent[v] = u
+			came[v] = arrived
+			r, c = divmod(v, cols)
+			hv = h(r, c, tr, tc)
+			heapq.heappush(open, (g + hv, hv, v))
+		if stats is not None:
+			stats.frontier(len(open))
+	return None
+
+def _retrace_jumps(grid, parent, end):
+	#fill in the straight runs between consecutive jump points
+	jumps = [end]
+	while parent[jumps[-1]] != -1:
+		jumps.append(parent[jumps[-1]])
+	jumps.reverse()
+	path = [jumps[0]]
+	for a, b in zip(jumps, jumps[1:]):
+		step = (1 if b > a else -1) * (1 if a // grid.cols == b // grid.cols else grid.cols)
+		path.extend(range(a + step, b + step, step))
+	return [grid.cell(i) for i in path]
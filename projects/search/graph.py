@@ -0,0 +1,158 @@
+import heapq, mmap, struct
+from array import array
+
+_MAGIC = b"CSR1"
+_HEADER = struct.Struct("<4s4xqqq") #magic, node count, edge count, bytes of names
+
+class CompiledGraph:
+	"""A time_map frozen into integer node ids and CSR adjacency arrays.
+	The out-edges of node u are targets[offsets[u]:offsets[u+1]], with the matching travel
+	times in weights. names[u] is the original landmark name and ids maps it back."""
+	def __init__(self, names, offsets, targets, weights):
+		self.names = names
+		self.ids = {name: i for i, name in enumerate(names)}
+		self.offsets = offsets
+		self.targets = targets
+		self.weights = weights
+		self.path = None #set when the arrays are mapped from a file written by save()
+
+	def __len__(self):
+		return len(self.names)
+
+	def __repr__(self):
+		return "CompiledGraph({} nodes, {} edges)".format(len(self.names), self.num_edges)
+
+	@property
+	def num_edges(self):
+		return len(self.targets)
+
+	def edges(self, u):
+		"""(target id, weight) pairs for the out-edges of u, in time_map order."""
+		lo, hi = self.offsets[u], self.offsets[u + 1]
+		return zip(self.targets[lo:hi], self.weights[lo:hi])
+
+	def weight(self, u, v):
+		"""Travel time of edge u -> v, or None if there is no such road. Graphs loaded by
+		graph_io can hold parallel roads; the cheapest one is the one a search drives."""
+		best = None
+		for e in range(self.offsets[u], self.offsets[u + 1]):
+			if self.targets[e] == v and (best is None or self.weights[e] < best):
+				best = self.weights[e]
+		return best
+
+	def reverse(self):
+		"""The same graph with every edge flipped (in-edges become out-edges)."""
+		n = len(self.names)
+		counts = array('l', [0]) * (n + 1)
+		for v in self.targets:
+			counts[v + 1] += 1
+		for i in range(n):
+			counts[i + 1] += counts[i]
+		fill = array('l', counts)
+		targets = array('l', [0]) * len(self.targets)
+		weights = array('d', [0.0]) * len(self.weights)
+		for u in range(n):
+			for e in range(self.offsets[u], self.offsets[u + 1]):
+				v = self.targets[e]
+				targets[fill[v]] = u
+				weights[fill[v]] = self.weights[e]
+				fill[v] += 1
+		return CompiledGraph(self.names, counts, targets, weights)
+
+	def path_names(self, path):
+		"""Turn a list of node ids back into landmark names."""
+		return [self.names[u] for u in path]
+
+	def save(self, path):
+		"""Write the graph to path in the fixed-width layout load() maps straight into memory.
+		Names are stored as text, one per line, so they come back as strings."""
+		names = "\n".join(map(str, self.names)).encode("utf-8")
+		with open(path, "wb") as f:
+			f.write(_HEADER.pack(_MAGIC, len(self.names), len(self.targets), len(names)))
+			array('q', self.offsets).tofile(f)
+			array('q', self.targets).tofile(f)
+			array('d', self.weights).tofile(f)
+			f.write(names)
+
+	@classmethod
+	def load(cls, path):
+		"""Map a graph written by save(). offsets, targets and weights become read-only
+		memoryviews over the file, so loading does not copy them and processes that load the
+		same file share one copy through the page cache; only the names are decoded.
+		A loaded graph pickles as its path, so it can be handed to a multiprocessing.Pool."""
+		with open(path, "rb") as f:
+			data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+		magic, n, m, size = _HEADER.unpack_from(data)
+		if magic != _MAGIC:
+			raise ValueError("{} is not a compiled graph".format(path))
+		view = memoryview(data)
+		start = _HEADER.size
+		offsets = view[start:start + 8 * (n + 1)].cast('q')
+		start += 8 * (n + 1)
+		targets = view[start:start + 8 * m].cast('q')
+		start += 8 * m
+		weights = view[start:start + 8 * m].cast('d')
+		start += 8 * m
+		names = bytes(view[start:start + size]).decode("utf-8").split("\n") if n else []
+		graph = cls(names, offsets, targets, weights)
+		graph.path = path
+		return graph
+
+	def __reduce__(self):
+		if self.path is not None:
+			return (CompiledGraph.load, (self.path,))
+		return (CompiledGraph, (self.names, self.offsets, self.targets, self.weights))
+
+
+def compile_map(time_map):
+	"""Compile a dict-of-dicts time_map into a CompiledGraph.
+	Node ids follow the row order of time_map, so neighbors come out in the same order
+	expand() yields them; landmarks that only appear as targets are given ids at the end."""
+	names = list(time_map)
+	ids = {name: i for i, name in enumerate(names)}
+	offsets = array('l', [0])
+	targets = array('l')
+	weights = array('d')
+	for name in names:
+		for nxt, w in time_map[name].items():
+			if w is None:
+				continue
+			if nxt not in ids:
+				ids[nxt] = len(names)
+				names.append(nxt)
+			targets.append(ids[nxt])
+			weights.append(w)
+		offsets.append(len(targets))
+	while len(offsets) <= len(names): #target-only landmarks have no out-edges
+		offsets.append(len(targets))
+	return CompiledGraph(names, offsets, targets, weights)
+
+
+def dis_map_heuristic(graph, dis_map):
+	"""Adapt a name-keyed dis_map to the (node id, goal id) heuristic the compiled searches take."""
+	names = graph.names
+	return lambda u, t: dis_map[names[u]][names[t]]
+
+
+def dijkstra(graph, source):
+	"""One-to-all shortest travel times from source (a node id) over graph.
+	Returns (dist, parents) as flat arrays indexed by node id; unreachable nodes keep
+	dist inf and parent -1. This is preprocessing, so it does not go through expand()."""
+	n = len(graph)
+	dist = array('d', [float('inf')]) * n
+	parents = array('l', [-1]) * n
+	offsets, targets, weights = graph.offsets, graph.targets, graph.weights
+	dist[source] = 0.0
+	open = [(0.0, source)]
+	while open:
+		d, u = heapq.heappop(open)
+		if d > dist[u]: #stale entry
+			continue
+		for e in range(offsets[u], offsets[u + 1]):
+			v = targets[e]
+			nd = d + weights[e]
+			if nd < dist[v]:
+				dist[v] = nd
+				parents[v] = u
+				heapq.heappush(open, (nd, v))
+	return dist, parents
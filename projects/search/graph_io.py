@@ -0,0 +1,86 @@
+import gzip
+from array import array
+from graph import CompiledGraph
+
+def load_edge_list(path, directed=True, default_weight=1.0):
+	"""Stream an edge-list file into a graph.CompiledGraph. Each line is "node next [time]",
+	whitespace separated; blank lines and lines starting with # are skipped, and a missing
+	time means default_weight. Node names are the tokens as written, numbered in order of
+	first appearance. With directed=False every line also adds the road back.
+	Edges go straight into flat arrays, so no per-node dicts are built on the way."""
+	ids = {}
+	names = []
+	sources, targets, weights = array('l'), array('l'), array('d')
+
+	def node_id(name):
+		i = ids.get(name)
+		if i is None:
+			i = ids[name] = len(names)
+			names.append(name)
+		return i
+
+	with _open(path) as f:
+		for line in f:
+			fields = line.split()
+			if not fields or fields[0].startswith("#"):
+				continue
+			if len(fields) not in (2, 3):
+				raise ValueError("bad edge line: {!r}".format(line))
+			u, v = node_id(fields[0]), node_id(fields[1])
+			w = float(fields[2]) if len(fields) == 3 else default_weight
+			sources.append(u)
+			targets.append(v)
+			weights.append(w)
+			if not directed:
+				sources.append(v)
+				targets.append(u)
+				weights.append(w)
+	return _from_edges(names, sources, targets, weights)
+
+def load_dimacs(path):
+	"""Stream a DIMACS shortest-path file (.gr, as used by the 9th DIMACS challenge) into a
+	graph.CompiledGraph: "c" lines are comments, "p sp <nodes> <arcs>" comes first and each
+	"a <node> <next> <time>" line is one road. DIMACS numbers nodes from 1; node id i is
+	named str(i + 1), so paths come back in the file's numbering."""
+	n = None
+	sources, targets, weights = array('l'), array('l'), array('d')
+	with _open(path) as f:
+		for line in f:
+			if line.startswith("a"):
+				_, u, v, w = line.split()
+				u, v = int(u) - 1, int(v) - 1
+				if n is None or not (0 <= u < n and 0 <= v < n):
+					raise ValueError("arc outside the declared nodes: {!r}".format(line))
+				sources.append(u)
+				targets.append(v)
+				weights.append(float(w))
+			elif line.startswith("p"):
+				_, kind, nodes, _ = line.split()
+				if kind != "sp":
+					raise ValueError("not a shortest-path problem: {!r}".format(line))
+				n = int(nodes)
+	if n is None:
+		raise ValueError("{} has no problem line".format(path))
+	return _from_edges([str(i + 1) for i in range(n)], sources, targets, weights)
+
+def _open(path):
+	if str(path).endswith(".gz"):
+		return gzip.open(path, "rt")
+	return open(path)
+
+def _from_edges(names, sources, targets, weights):
+	#counting sort of the edges by source; edges keep their file order within a node
+	n = len(names)
+	offsets = array('l', [0]) * (n + 1)
+	for u in sources:
+		offsets[u + 1] += 1
+	for i in range(n):
+		offsets[i + 1] += offsets[i]
+	fill = array('l', offsets)
+	csr_targets = array('l', [0]) * len(targets)
+	csr_weights = array('d', [0.0]) * len(weights)
+	for u, v, w in zip(sources, targets, weights):
+		csr_targets[fill[u]] = v
+		csr_weights[fill[u]] = w
+		fill[u] += 1
+	return CompiledGraph(names, offsets, csr_targets, csr_weights)
@@ -0,0 +1,148 @@
+import heapq
+import expand as _expand
+from expand import expand
+from my_search import _heuristic, reverse_time_map
+
+_INF = float('inf')
+
+class DStarLite:
+	"""Incremental replanner (D* Lite) over a dict time_map, for when travel times change mid-route.
+	It searches backward from end and keeps its g/rhs estimates between calls, so after
+	update_edge() (and optionally move_start() once the driver has moved on) the next plan()
+	only re-expands the nodes whose estimates the changes actually invalidated.
+	dis_map (a table or heuristic object) must be consistent. Each expansion goes through expand(),
+	and self.expansions holds the count for the last plan() for comparison with a cold a_star_search.
+	Pass stats (an expand.SearchStats) to plan() to count into it instead of the global counter."""
+	def __init__(self, dis_map, time_map, start, end):
+		self.time_map = time_map
+		self.start, self.end = start, end
+		self.expansions = 0
+		self._h = _heuristic(dis_map)
+		self._rev = reverse_time_map(time_map) #predecessors, kept in sync by update_edge
+		self._last = start
+		self._km = 0
+		self._g = {}
+		self._rhs = {end: 0}
+		self._open = {end: self._key(end)} #node -> its current key in the heap
+		self._heap = [self._open[end] + (end,)]
+
+	def plan(self, stats=None):
+		"""Bring the estimates up to date and return the current best path from start to end."""
+		before = _expand.expand_count if stats is None else stats.expansions
+		self._compute_shortest_path(stats)
+		self.expansions = (_expand.expand_count if stats is None else stats.expansions) - before
+		if self._g.get(self.start, _INF) == _INF:
+			print("No solution found")
+			return
+		#walk down cost + g, ties to the lower g; roads back onto the path are skipped, so ties
+		#around a zero-time cycle cannot loop, and a dead end backs up. Every node is entered once
+		path, seen = [self.start], {self.start}
+		options = [self._ranked(self.start, seen)]
+		while path[-1] != self.end:
+			if not options[-1]:
+				path.pop()
+				options.pop()
+				if not path:
+					print("No solution found")
+					return
+				continue
+			next = options[-1].pop()
+			if next in seen:
+				continue
+			seen.add(next)
+			path.append(next)
+			options.append(self._ranked(next, seen))
+		return path
+
+	def update_edge(self, node, next, t):
+		"""Set time_map[node][next] = t (None closes the road) and queue the repair; call plan() after."""
+		old = self._cost(node, next)
+		self.time_map[node][next] = t
+		if t is None:
+			self._rev.get(next, {}).pop(node, None)
+		else:
+			self._rev.setdefault(next, {})[node] = t
+		new = self._cost(node, next)
+		if node == self.end or old == new:
+			return
+		if new < old:
+			self._rhs[node] = min(self._rhs.get(node, _INF), new + self._g.get(next, _INF))
+		elif self._rhs.get(node, _INF) == old + self._g.get(next, _INF):
+			self._rhs[node] = self._best_rhs(node)
+		self._update_vertex(node)
+
+	def move_start(self, node):
+		"""The driver has reached node; later plans start from there."""
+		self._km += self._h(self._last, node)
+		self._last = node
+		self.start = node
+
+	def _cost(self, node, next):
+		t = self.time_map.get(node, {}).get(next)
+		return _INF if t is None else t
+
+	def _succ(self, node):
+		return [next for next, t in self.time_map.get(node, {}).items() if t is not None]
+
+	def _ranked(self, node, seen):
+		#unvisited successors reachable at all, best last
+		ranked = []
+		for next in self._succ(node):
+			g = self._g.get(next, _INF)
+			if next not in seen and g != _INF:
+				ranked.append((self._cost(node, next) + g, g, next))
+		ranked.sort(key=lambda option: option[:2], reverse=True)
+		return [next for _, _, next in ranked]
+
+	def _best_rhs(self, node):
+		return min((self._cost(node, next) + self._g.get(next, _INF) for next in self._succ(node)), default=_INF)
+
+	def _key(self, node):
+		m = min(self._g.get(node, _INF), self._rhs.get(node, _INF))
+		return (m + self._h(self.start, node) + self._km, m)
+
+	def _update_vertex(self, node):
+		if self._g.get(node, _INF) != self._rhs.get(node, _INF):
+			key = self._key(node)
+			self._open[node] = key
+			heapq.heappush(self._heap, key + (node,))
+		else:
+			self._open.pop(node, None) #any heap entry left behind is now stale
+
+	def _top(self):
+		while self._heap:
+			k1, k2, node = self._heap[0]
+			if self._open.get(node) == (k1, k2):
+				return (k1, k2), node
+			heapq.heappop(self._heap) #stale
+		return (_INF, _INF), None
+
+	def _compute_shortest_path(self, stats):
+		while True:
+			key, u = self._top()
+			if u is None or (key >= self._key(self.start) and
+					self._rhs.get(self.start, _INF) == self._g.get(self.start, _INF)):
+				return
+			new_key = self._key(u)
+			if key < new_key: #km moved on since u was queued
+				self._open[u] = new_key
+				heapq.heappush(self._heap, new_key + (u,))
+				continue
+			heapq.heappop(self._heap)
+			del self._open[u]
+			preds = expand(u, self._rev, stats)
+			g_old = self._g.get(u, _INF)
+			if g_old > self._rhs.get(u, _INF): #overconsistent: settle u
+				self._g[u] = self._rhs[u]
+				for s in preds:
+					if s != self.end:
+						self._rhs[s] = min(self._rhs.get(s, _INF), self._cost(s, u) + self._g[u])
+						self._update_vertex(s)
+			else: #underconsistent: u got more expensive, re-derive everything that leaned on it
+				self._g[u] = _INF
+				for s in preds + [u]:
+					if s != self.end and self._rhs.get(s, _INF) == self._cost(s, u) + g_old:
+						self._rhs[s] = self._best_rhs(s)
+					self._update_vertex(s)
+			if stats is not None:
+				stats.frontier(len(self._open))
@@ -0,0 +1,104 @@
+import random, struct
+from array import array
+from graph import compile_map, dijkstra
+
+_MAGIC = b"ALT1"
+_INF = float('inf')
+
+class LandmarkIndex:
+	"""ALT (A*, Landmarks, Triangle inequality) heuristic for a graph.CompiledGraph.
+	For every landmark L it stores the travel time from L to each node and from each node to L,
+	as flat K*N float arrays, and bounds the travel time u -> t from below by
+	max(d(u, L) - d(t, L), d(L, t) - d(L, u)) over all landmarks. The bound is consistent, so it
+	can stand in for a dis_map anywhere: call it with landmark names for a_star_search /
+	bidirectional_search, or pass index.lower_bound (node ids) to a_star_search_compiled."""
+	def __init__(self, graph, landmarks, dist_from, dist_to):
+		self.graph = graph
+		self.landmarks = landmarks
+		self.dist_from = dist_from #dist_from[k * N + v] = d(landmarks[k], v)
+		self.dist_to = dist_to #dist_to[k * N + v] = d(v, landmarks[k])
+
+	def __repr__(self):
+		return "LandmarkIndex({} landmarks over {} nodes)".format(len(self.landmarks), len(self.graph))
+
+	def __call__(self, node, end):
+		ids = self.graph.ids
+		return self.lower_bound(ids[node], ids[end])
+
+	def lower_bound(self, u, t):
+		n = len(self.graph)
+		dist_from, dist_to = self.dist_from, self.dist_to
+		best = 0.0
+		for k in range(len(self.landmarks)):
+			base = k * n
+			to_u, to_t = dist_to[base + u], dist_to[base + t]
+			if to_u != _INF or to_t != _INF: #both inf says nothing
+				best = max(best, to_u - to_t)
+			from_u, from_t = dist_from[base + u], dist_from[base + t]
+			if from_u != _INF or from_t != _INF:
+				best = max(best, from_t - from_u)
+		return best
+
+	def save(self, path):
+		"""Write the index to path so later processes can load() it instead of rebuilding."""
+		n, k = len(self.graph), len(self.landmarks)
+		with open(path, "wb") as f:
+			f.write(_MAGIC)
+			f.write(struct.pack("<qq", n, k))
+			array('q', self.landmarks).tofile(f)
+			self.dist_from.tofile(f)
+			self.dist_to.tofile(f)
+
+	@classmethod
+	def load(cls, path, graph):
+		"""Read an index written by save(); graph must be the one it was built from."""
+		with open(path, "rb") as f:
+			if f.read(4) != _MAGIC:
+				raise ValueError("{} is not a landmark index".format(path))
+			n, k = struct.unpack("<qq", f.read(16))
+			if n != len(graph):
+				raise ValueError("index was built for {} nodes, graph has {}".format(n, len(graph)))
+			landmarks = array('q')
+			landmarks.fromfile(f, k)
+			dist_from, dist_to = array('d'), array('d')
+			dist_from.fromfile(f, k * n)
+			dist_to.fromfile(f, k * n)
+		return cls(graph, list(landmarks), dist_from, dist_to)
+
+
+def build_landmarks(graph, k=8, seed=0):
+	"""Pick k landmarks by farthest-point selection and run one forward and one backward
+	Dijkstra from each. Each new landmark is the node with the largest travel time to its
+	nearest already-chosen landmark, which spreads them toward the edges of the map.
+	k is capped at the number of nodes, so an empty graph gets an index with no landmarks."""
+	n = len(graph)
+	k = max(0, min(k, n))
+	dist_from, dist_to = array('d'), array('d')
+	landmarks = []
+	if k == 0: #no landmarks: the bound is always 0
+		return LandmarkIndex(graph, landmarks, dist_from, dist_to)
+	rev = graph.reverse()
+	nearest = array('d', [_INF]) * n
+	candidate = random.Random(seed).randrange(n)
+	for _ in range(k):
+		landmarks.append(candidate)
+		forward, _ = dijkstra(graph, candidate)
+		backward, _ = dijkstra(rev, candidate)
+		dist_from.extend(forward)
+		dist_to.extend(backward)
+		for v in range(n):
+			d = min(forward[v], backward[v])
+			if d < nearest[v]:
+				nearest[v] = d
+		#farthest reachable node not yet picked; unreachable ones stay at inf and are skipped
+		far = [v for v in range(n) if nearest[v] != _INF and v not in landmarks]
+		if not far:
+			far = [v for v in range(n) if v not in landmarks]
+			if not far:
+				break
+		candidate = max(far, key=lambda v: nearest[v])
+	return LandmarkIndex(graph, landmarks, dist_from, dist_to)
+
+def build_landmarks_for_map(time_map, k=8, seed=0):
+	"""build_landmarks() straight from a dict time_map."""
+	return build_landmarks(compile_map(time_map), k, seed)
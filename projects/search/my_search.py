@@ -1,15 +1,6 @@
-from cmath import atan
-from distutils.log import error
-from gettext import find
-from http.client import OK
-from importlib.resources import path
-from logging.config import valid_ident
-from platform import node
-from queue import PriorityQueue
-from re import X
-from sre_constants import FAILURE
-from this import s
-from expand import expand
+import heapq, time
+from collections import deque
+from expand import expand, expand_compiled, instrumented
 
 class Node:
 	def __init__(self, name, g, h, order):
@@ -19,54 +10,65 @@ class Node:
 		self._order = order
 
 class PriorityQ:
+	"""Open list for A*: a binary heap of (f, h, order) keys plus a name index.
+	Decreasing g pushes a fresh heap entry; the superseded one is dropped lazily on pop."""
 	def __init__(self):
-		self._data = []
-	
+		self._heap = []
+		self._entries = {} #name -> live Node
+
+	def __len__(self):
+		return len(self._entries)
+
+	def _push(self, node: Node):
+		heapq.heappush(self._heap, (node._gval + node._hval, node._hval, node._order, node))
+
 	def insert(self, node: Node):
-		self._data.append(node)
-	
+		self._entries[node._name] = node
+		self._push(node)
+
 	def pop(self):
-		minf = self._data[0] #initialize minf to first item in data
-		for item in self._data:
-			#calculate f
-			f = item._hval + item._gval
-			minff = minf._hval + minf._gval
-
-			if f < minff:
-				minf = item
-			elif f == minff:
-				if item._hval < minf._hval:
-					minf = item
-				elif item._order < minf._order:
-					minf = item
-
-		self._data.remove(minf) #remove min from data
-		return minf
+		#lowest f, then lowest h, then whichever entered the open list first
+		while self._heap:
+			f, h, order, node = heapq.heappop(self._heap)
+			if self._entries.get(node._name) is node and f == node._gval + node._hval:
+				del self._entries[node._name]
+				return node
+		raise IndexError("pop from empty PriorityQ")
 
 	def findg(self, name):
-		for item in self._data:
-			if item._name == name:
-				return item._gval
-		return None
-	
+		node = self._entries.get(name)
+		if node is None:
+			return None
+		return node._gval
+
 	def updateg(self, name, g):
-		for item in self._data:
-			if item._name == name:
-				item._gval = g
+		node = self._entries.get(name)
+		if node is not None:
+			node._gval = g
+			self._push(node) #the old heap entry is now stale
+
 
+def _heuristic(dis_map):
+	#dis_map is either the usual distance table or a heuristic object called as h(node, end),
+	#e.g. a landmarks.LandmarkIndex
+	if callable(dis_map):
+		return dis_map
+	return lambda node, end: dis_map[node][end]
 
-def a_star_search (dis_map, time_map, start, end):
+@instrumented
+def a_star_search (dis_map, time_map, start, end, stats=None):
+	heuristic = _heuristic(dis_map)
 	open = PriorityQ()
 	order = 0
-	startnode = Node(start, 0, dis_map[start][end], order)
+	startnode = Node(start, 0, heuristic(start, end), order)
 	open.insert(startnode)
 	parents = {start: None}
-	closed = []
+	closed = set()
 
-	while len(open._data) != 0:
+	while open:
 		currnode = open.pop() 
 		curr = currnode._name
-		closed.append(curr)
+		closed.add(curr)
 
 		if curr == end:
 			path = [end]
@@ -76,11 +78,11 @@ def a_star_search (dis_map, time_map, start, end):
 				i = parents[i] #retraces path from end to start
 			return path[::-1]
 		
-		list = expand(curr, time_map) #obtain list of adjacent nodes
+		list = expand(curr, time_map, stats) #obtain list of adjacent nodes
 		for node in list:
 			if node not in closed:
 				g = currnode._gval + time_map[curr][node]
-				h = dis_map[node][end]
+				h = heuristic(node, end)
 				if (open.findg(node) == None): #if node is not in open, insert node and add parent
 					order += 1
 					realnode = Node(node, g, h, order)
@@ -89,52 +91,493 @@ def a_star_search (dis_map, time_map, start, end):
 				elif g < open.findg(node): #if new g value is smaller than old g value, update g and parent
 					open.updateg(node, g)
 					parents[node] = curr
+		if stats is not None:
+			stats.frontier(len(open))
 	print("No solution found")
 	return
 
-def depth_first_search(time_map, start, end):
-	fringe = [start]
-	path = [end]
+@instrumented
+def ida_star_search(dis_map, time_map, start, end, budget=None, stats=None):
+	"""Iterative-deepening A*: repeated depth-first passes, each cut off at an f bound that rises
+	to the smallest f that overflowed the last pass. Memory is the current path plus a table of
+	the best g seen per node in this pass, which prunes transpositions; budget caps how many
+	nodes that table may hold (None = unbounded, 0 = pure IDA*). Returns an optimal path for an
+	admissible dis_map. Pass stats to see stats.reexpansions, the work repeated across passes."""
+	heuristic = _heuristic(dis_map)
+	expanded = set() if stats is not None else None
+	bound = heuristic(start, end)
+
+	while True:
+		next_bound = float('inf')
+		best_g = {start: 0} if budget != 0 else {}
+		frames = [[start, 0, None]] #node, g, iterator over its children once expanded
+		on_path = {start}
+		while frames:
+			frame = frames[-1]
+			curr, g, children = frame
+			if children is None:
+				f = g + heuristic(curr, end)
+				if f > bound: #cut off; remember how far over it went
+					next_bound = min(next_bound, f)
+					frames.pop()
+					on_path.discard(curr)
+					continue
+				if curr == end:
+					return [frame[0] for frame in frames]
+				if expanded is not None:
+					if curr in expanded:
+						stats.reexpansions += 1
+					expanded.add(curr)
+				children = frame[2] = iter(expand(curr, time_map, stats))
+				if stats is not None:
+					stats.frontier(len(frames))
+			for node in children:
+				if node in on_path:
+					continue
+				node_g = g + time_map[curr][node]
+				if node in best_g and best_g[node] <= node_g: #already searched from here at least as cheaply
+					continue
+				if node in best_g or budget is None or len(best_g) < budget:
+					best_g[node] = node_g
+				frames.append([node, node_g, None])
+				on_path.add(node)
+				break
+			else:
+				frames.pop()
+				on_path.discard(curr)
+		if next_bound == float('inf'):
+			print("No solution found")
+			return
+		bound = next_bound
+
+
+class _SMANode:
+	__slots__ = ("name", "g", "f", "depth", "parent", "children", "forgotten", "version")
+
+	def __init__(self, name, g, f, depth, parent):
+		self.name, self.g, self.f, self.depth, self.parent = name, g, f, depth, parent
+		self.children = {} #name -> child node still in memory
+		self.forgotten = {} #name -> backed-up f of each child dropped to free memory
+		self.version = 0 #bumped whenever the node's heap entries go stale
+
+@instrumented
+def sma_star_search(dis_map, time_map, start, end, budget, strict=False, stats=None):
+	"""Simplified memory-bounded A*: a tree search that keeps at most budget nodes. When an
+	expansion goes over budget, the leaf with the highest f (oldest on ties) is forgotten and its
+	f is backed up into its parent, which goes back on the open list keyed by the best f it has
+	forgotten and regenerates that child (with the backed-up f) if it ever becomes the best choice
+	again. Nodes at depth budget - 1 get f = inf, since no path through them fits in memory.
+	With an admissible dis_map it returns the cheapest path of at most budget landmarks, or None
+	if there is none. That is the optimal path when one fits in the budget, but when every optimal
+	path is longer a costlier short one comes back. With strict=True the path is only returned
+	when the heuristic rules out anything cheaper through the nodes cut off for lack of memory,
+	so it is optimal; otherwise (even if an optimal path did fit but that cannot be shown) the
+	result is None. stats.reexpansions counts expansions of nodes that had been expanded before."""
+	INF = float('inf')
+	heuristic = _heuristic(dis_map)
+	expanded = set() if stats is not None else None
+	root = _SMANode(start, 0, heuristic(start, end), 0, None)
+	best, leaves = [], [] #lazy heaps: open nodes by (f, deepest, newest), forgettable leaves by (f, shallowest, oldest) reversed
+	size = 1
+	order = 0
+	cut = INF #lowest f among the nodes given f = inf for lack of memory
+
+	def reopen(node):
+		nonlocal order
+		order += 1
+		node.version += 1
+		if node.children: #still has children in memory: open only for the ones it forgot
+			if node.forgotten:
+				heapq.heappush(best, (min(node.forgotten.values()), -node.depth, -order, node.version, node))
+			return
+		if node.forgotten:
+			node.f = max(node.f, min(node.forgotten.values()))
+		heapq.heappush(best, (node.f, -node.depth, -order, node.version, node))
+		if node is not root:
+			heapq.heappush(leaves, (-node.f, node.depth, order, node.version, node))
+
+	def on_path(node, name):
+		while node is not None:
+			if node.name == name:
+				return True
+			node = node.parent
+		return False
+
+	reopen(root)
+	while best:
+		key, _, _, version, currnode = heapq.heappop(best)
+		if version != currnode.version or currnode.parent is None and currnode is not root:
+			continue #stale
+		if key == INF:
+			break
+		curr = currnode.name
+		if curr == end:
+			if strict and cut < currnode.g: #a cheaper path may run through a node that did not fit
+				break
+			path = []
+			while currnode is not None:
+				path.append(currnode.name)
+				currnode = currnode.parent #retraces path from end to start
+			return path[::-1]
+
+		if expanded is not None:
+			if curr in expanded:
+				stats.reexpansions += 1
+			expanded.add(curr)
+		currnode.version += 1 #closed until something changes under it
+		forgotten, currnode.forgotten = currnode.forgotten, {}
+		for node in expand(curr, time_map, stats):
+			if node in currnode.children or on_path(currnode, node):
+				continue
+			g = currnode.g + time_map[curr][node]
+			if currnode.depth + 1 >= budget - 1 and node != end:
+				cut = min(cut, max(currnode.f, g + heuristic(node, end)))
+				f = INF #a path through here cannot fit in memory
+			else: #pathmax, plus whatever was backed up before this child was forgotten
+				f = max(currnode.f, g + heuristic(node, end), forgotten.get(node, 0))
+			child = currnode.children[node] = _SMANode(node, g, f, currnode.depth + 1, currnode)
+			size += 1
+			reopen(child)
+		if not currnode.children: #dead end
+			currnode.f = INF
+			if currnode is root:
+				break
+			reopen(currnode)
+		while size > budget:
+			key, _, _, version, node = heapq.heappop(leaves)
+			if version != node.version or node.children:
+				continue #stale
+			size -= 1
+			node.version += 1
+			parent = node.parent
+			del parent.children[node.name]
+			parent.forgotten[node.name] = node.f
+			node.parent = None
+			reopen(parent)
+		if len(best) > 4 * budget + 16: #drop the stale entries that pile up in both heaps
+			best[:] = [entry for entry in best if entry[-2] == entry[-1].version]
+			leaves[:] = [entry for entry in leaves if entry[-2] == entry[-1].version]
+			heapq.heapify(best)
+			heapq.heapify(leaves)
+		if stats is not None:
+			stats.frontier(size)
+	print("No solution found")
+	return
+
+@instrumented
+def ara_star_search(dis_map, time_map, start, end, deadline=None, weight=3.0, step=0.5, stats=None):
+	"""Anytime repairing A* (ARA*): a fast search with the heuristic inflated by weight, then
+	passes with the weight lowered by step until it reaches 1. Each pass keeps the g values
+	and parents of the last one and only re-expands the nodes whose g dropped since they were
+	expanded, so later passes cost much less than a fresh weighted A*.
+	deadline is a time budget in seconds (None = run to the optimal path). Returns
+	(path, bound): the best path found when the passes finish or the deadline expires, and a
+	bound on how far its travel time can be from optimal (cost <= bound * optimal; 1.0 once it
+	is proven optimal), or (None, inf) if no path was found. dis_map must be consistent."""
+	INF = float('inf')
+	heuristic = _heuristic(dis_map)
+	stop = None if deadline is None else time.perf_counter() + deadline
+	h = {start: heuristic(start, end)}
+	g = {start: 0}
 	parents = {start: None}
+	keys = {} #node -> its live key in open
+	open = []
+	order = 0
+	closed, incons = set(), set()
 
-	while fringe:
-		curr = fringe.pop()
+	def push(node):
+		nonlocal order
+		order += 1
+		keys[node] = (g[node] + weight * h[node], h[node], order)
+		heapq.heappush(open, keys[node] + (node,))
+
+	def bound():
+		#every node whose g may still drop is in open or incons, so min(g + h) over them
+		#bounds the optimal travel time from below
+		low = min((g[node] + h[node] for node in list(keys) + list(incons)), default=INF)
+		if g[end] <= low:
+			return 1.0
+		return g[end] / low if low > 0 else INF
+
+	def result(eps):
+		if end not in g:
+			if eps is not None:
+				print("No solution found")
+			return None, INF
+		path = [end]
+		while parents[path[-1]] is not None:
+			path.append(parents[path[-1]]) #retraces path from end to start
+		return path[::-1], eps
+
+	push(start)
+	eps = INF
+	while True:
+		while open:
+			top = open[0]
+			if keys.get(top[3]) != top[:3]: #stale
+				heapq.heappop(open)
+				continue
+			if g.get(end, INF) <= top[0]: #nothing left in open can improve on this pass's path
+				break
+			if stop is not None and time.perf_counter() > stop:
+				return result(min(eps, bound()) if end in g else None)
+			heapq.heappop(open)
+			curr = top[3]
+			del keys[curr]
+			closed.add(curr)
+			for node in expand(curr, time_map, stats):
+				new_g = g[curr] + time_map[curr][node]
+				if new_g < g.get(node, INF):
+					g[node] = new_g
+					parents[node] = curr
+					if node not in h:
+						h[node] = heuristic(node, end)
+					if node in closed:
+						incons.add(node) #expanded this pass already: repair it in the next one
+					else:
+						push(node)
+			if stats is not None:
+				stats.frontier(len(keys))
+		if end not in g:
+			return result(INF)
+		eps = 1.0 if weight <= 1.0 else min(eps, weight, bound()) #a finished pass is within weight
+		if eps <= 1.0:
+			return result(1.0)
+		weight = max(1.0, weight - step)
+		pending = set(keys) | incons #re-key everything under the new weight
+		keys, open = {}, []
+		incons, closed = set(), set()
+		for node in pending:
+			push(node)
+
+def reverse_time_map(time_map):
+	"""The time_map with every road flipped: reverse_time_map(m)[b][a] == m[a][b]. Only real roads
+	are stored, which is all expand() looks at."""
+	rev = {node: {} for node in time_map}
+	for node, row in time_map.items():
+		for next, t in row.items():
+			if t is not None:
+				rev.setdefault(next, {})[node] = t
+	return rev
+
+@instrumented
+def bidirectional_search(dis_map, time_map, start, end, reverse_map=None, stats=None):
+	"""Searches forward from start over time_map and backward from end over its reverse (pass
+	reverse_map to reuse one across queries), always growing the side with the smaller key.
+	With dis_map=None this is bidirectional Dijkstra and always returns a shortest path. Otherwise
+	both sides share the average potential (h(n, end) - h(start, n)) / 2, which keeps the result
+	optimal as long as dis_map (a table or a heuristic object) is a consistent estimate of travel time.
+	Stops once the two smallest keys sum to at least the best meeting cost found so far; both
+	directions expand through expand(), so expand_count is comparable with a_star_search."""
+	if start == end:
+		return [start]
+	rev = reverse_map if reverse_map is not None else reverse_time_map(time_map)
+	if dis_map is None:
+		potential = lambda n: 0
+	else:
+		heuristic = _heuristic(dis_map)
+		potential = lambda n: (heuristic(n, end) - heuristic(start, n)) / 2
+	maps = (time_map, rev)
+	sign = (1, -1) #the backward search uses the negated potential
+	dist = ({start: 0}, {end: 0})
+	parents = ({start: None}, {end: None})
+	closed = (set(), set())
+	order = 0
+	open = ([(potential(start), order, start)], [(-potential(end), order, end)])
+	best, meet = float('inf'), None
+
+	while open[0] and open[1]:
+		if open[0][0][0] + open[1][0][0] >= best:
+			break
+		side = 0 if open[0][0][0] <= open[1][0][0] else 1
+		other = 1 - side
+		key, _, curr = heapq.heappop(open[side])
+		if curr in closed[side]: #stale entry left behind by a decrease-key
+			continue
+		closed[side].add(curr)
+
+		for node in expand(curr, maps[side], stats):
+			if node in closed[side]:
+				continue
+			g = dist[side][curr] + maps[side][curr][node]
+			if g < dist[side].get(node, float('inf')):
+				dist[side][node] = g
+				parents[side][node] = curr
+				order += 1
+				heapq.heappush(open[side], (g + sign[side] * potential(node), order, node))
+			if node in dist[other] and dist[side][node] + dist[other][node] < best:
+				best, meet = dist[side][node] + dist[other][node], node
+		if stats is not None:
+			stats.frontier(len(open[0]) + len(open[1]))
+
+	if meet is None:
+		print("No solution found")
+		return
+	path = [meet]
+	i = meet
+	while parents[0][i] != None:
+		path.append(parents[0][i])
+		i = parents[0][i] #retraces path from the meeting node back to start
+	path = path[::-1]
+	i = meet
+	while parents[1][i] != None:
+		path.append(parents[1][i])
+		i = parents[1][i] #and forward from the meeting node to end
+	return path
+
+def traverse(time_map, start, order="breadth", stats=None):
+	"""Generator over the nodes reachable from start, yielding (node, parent, depth) as each one
+	is visited (parent is None for start). order is "breadth" (FIFO fringe) or "depth" (LIFO
+	fringe, children tried left to right). A node is expanded only when the caller asks for the
+	next one, so stopping early also stops the expansions. Each node is visited at most once."""
+	if order == "breadth":
+		fringe = deque([(start, None, 0)])
+		seen = {start} #in the fringe or already visited
+		while fringe:
+			curr, parent, depth = fringe.popleft()
+			yield curr, parent, depth
+			for node in expand(curr, time_map, stats):
+				if node not in seen:
+					seen.add(node)
+					fringe.append((node, curr, depth + 1))
+			if stats is not None:
+				stats.frontier(len(fringe))
+	elif order == "depth":
+		fringe = [(start, None, 0)]
+		seen = set() #already visited
+		while fringe:
+			curr, parent, depth = fringe.pop()
+			if curr in seen: #pushed again by a later parent before this copy was reached
+				continue
+			seen.add(curr)
+			yield curr, parent, depth
+			for node in reversed(expand(curr, time_map, stats)):
+				if node not in seen:
+					fringe.append((node, curr, depth + 1))
+			if stats is not None:
+				stats.frontier(len(fringe))
+	else:
+		raise ValueError("order must be 'breadth' or 'depth', not {!r}".format(order))
+
+def _traverse_to(time_map, start, end, order, stats):
+	parents = {}
+	for curr, parent, _ in traverse(time_map, start, order, stats):
+		parents[curr] = parent
 		if curr == end:
+			path = [end]
 			i = end
 			while(parents[i] != None):
 				path.append(parents[i])
 				i = parents[i] #retraces path from end to start
 			return path[::-1]
-		else:
-			expandlist = expand(curr, time_map)
-			for item in expandlist:
-				parents[item] = curr
-			fringe = fringe + expandlist[::-1]
 	print("No solution found")
 	return
 
-def breadth_first_search(time_map, start, end):
-	fringe = [start]
-	parents = {start: None} #dictionary: key is node, value is its parent
+@instrumented
+def depth_first_search(time_map, start, end, stats=None):
+	#each node is expanded at most once, so where paths reconverge this expands fewer nodes
+	#than the old fringe-list DFS, which expanded a node again for every path that reached it
+	return _traverse_to(time_map, start, end, "depth", stats)
+
+@instrumented
+def breadth_first_search(time_map, start, end, stats=None):
+	return _traverse_to(time_map, start, end, "breadth", stats)
+
+def _retrace_ids(graph, parents, end):
 	path = [end]
-	seen = []
+	while parents[path[-1]] != -1:
+		path.append(parents[path[-1]]) #retraces path from end to start
+	return graph.path_names(path[::-1])
 
-	while fringe: #while fringe is not empty
-		curr = fringe.pop(0) #set curr to top of fringe
-		if curr == end:
-			i = end
-			while(parents[i] != None):
-				path.append(parents[i])
-				i = parents[i] #retraces path from end to start
-			return path[::-1] #reverses path ... .reverse() lets you print reversed but returns NONE!
-		else:
-			uncutexpand = expand(curr, time_map) #this is all the nodes connected to curr
-			cutexpand = [] #this is all NEW nodes connected to curr
-			for item in uncutexpand:
-				if (item not in seen) and (item not in fringe):
-					cutexpand.append(item)
-					parents[item] = curr #add any new parent-child relations to dictionary
-			fringe = fringe + cutexpand #add all the NEW nodes connected to curr to fringe
-			seen.append(curr) #mark curr as seen
+@instrumented
+def a_star_search_compiled(graph, start, end, heuristic=None, stats=None):
+	"""A* over a graph.CompiledGraph; start/end are landmark names and so is the returned path.
+	heuristic(u, t) takes node ids (see graph.dis_map_heuristic); without one this is Dijkstra.
+	Ties break on (f, h, order) exactly like a_star_search, so expansion counts match."""
+	s, t = graph.ids[start], graph.ids[end]
+	targets, weights = graph.targets, graph.weights
+	h = heuristic if heuristic is not None else (lambda u, t: 0)
+	order = 0
+	hval = {s: h(s, t)}
+	gval = {s: 0}
+	orders = {s: order}
+	parents = {s: -1}
+	closed = set()
+	open = [(hval[s], hval[s], order, s)]
+
+	while open:
+		f, hu, o, u = heapq.heappop(open)
+		if u in closed or f != gval[u] + hu: #stale entry left behind by a decrease-key
+			continue
+		closed.add(u)
+		if u == t:
+			return _retrace_ids(graph, parents, t)
+
+		for e in expand_compiled(u, graph, stats):
+			v = targets[e]
+			if v in closed:
+				continue
+			g = gval[u] + weights[e]
+			if v not in gval: #first time v is generated
+				order += 1
+				orders[v] = order
+				hval[v] = h(v, t)
+			elif g >= gval[v]:
+				continue
+			gval[v] = g
+			parents[v] = u
+			heapq.heappush(open, (g + hval[v], hval[v], orders[v], v))
+		if stats is not None:
+			stats.frontier(len(open))
+	print("No solution found")
+	return
+
+@instrumented
+def depth_first_search_compiled(graph, start, end, stats=None):
+	"""depth_first_search over a graph.CompiledGraph. Children are tried left to right, and
+	already-expanded nodes are skipped so cyclic road graphs terminate."""
+	s, t = graph.ids[start], graph.ids[end]
+	targets = graph.targets
+	fringe = [s]
+	parents = {s: -1}
+	closed = set()
+
+	while fringe:
+		u = fringe.pop()
+		if u in closed:
+			continue
+		if u == t:
+			return _retrace_ids(graph, parents, t)
+		closed.add(u)
+		children = [targets[e] for e in expand_compiled(u, graph, stats)]
+		for v in reversed(children):
+			if v not in closed:
+				parents[v] = u
+				fringe.append(v)
+		if stats is not None:
+			stats.frontier(len(fringe))
 	print("No solution found")
-	return #if this gets called, that means fringe was empty before solution was found
\ No newline at end of file
+	return
+
+@instrumented
+def breadth_first_search_compiled(graph, start, end, stats=None):
+	"""breadth_first_search over a graph.CompiledGraph, with a deque fringe and a set of
+	discovered nodes instead of list membership scans."""
+	s, t = graph.ids[start], graph.ids[end]
+	targets = graph.targets
+	fringe = deque([s])
+	parents = {s: -1} #doubles as the set of discovered nodes
+
+	while fringe:
+		u = fringe.popleft()
+		if u == t:
+			return _retrace_ids(graph, parents, t)
+		for e in expand_compiled(u, graph, stats):
+			v = targets[e]
+			if v not in parents:
+				parents[v] = u
+				fringe.append(v)
+		if stats is not None:
+			stats.frontier(len(fringe))
+	print("No solution found")
+	return
@@ -0,0 +1,144 @@
+import heapq, queue, time
+import multiprocessing as mp
+import expand as _expand
+from expand import SearchStats, expand_compiled, instrumented
+
+_INF = float('inf')
+
+def owner(u, processes):
+	"""The worker that owns node id u: a multiplicative hash, so neighboring ids spread out."""
+	return (u * 2654435761 & 0xffffffff) % processes
+
+@instrumented
+def hda_star_search(graph, start, end, heuristic=None, processes=4, batch=64, stats=None):
+	"""Hash-distributed A* over a graph.CompiledGraph, for single queries too big for one core.
+	Every node is owned by one of processes workers (see owner()); each worker keeps the open
+	list, g values and parents of its own nodes, expands them through expand_compiled(), and
+	ships every generated node it does not own to the owner in batches of up to batch nodes.
+	The worker owning end publishes the best goal cost found so far and everyone prunes nodes
+	whose f can no longer beat it. The search ends when every worker is idle and as many
+	batches have been received as were sent, seen the same way twice in a row.
+	heuristic(u, t) takes node ids and must be admissible for the path to be optimal; it runs
+	in the workers, so on platforms that spawn rather than fork it has to be picklable (a
+	landmarks.LandmarkIndex's lower_bound is, a lambda is not). start/end are names and so is
+	the returned path, like a_star_search_compiled. Per-worker counts are added to stats, or
+	to the global expand_count without one."""
+	s, t = graph.ids[start], graph.ids[end]
+	if s == t:
+		return [start]
+	ctx = mp.get_context()
+	inboxes = [ctx.Queue() for _ in range(processes)]
+	results = ctx.Queue()
+	sent = ctx.Array('q', processes, lock=False) #batches each worker has put on a queue
+	received = ctx.Array('q', processes, lock=False) #and taken off its own
+	idle = ctx.Array('b', processes, lock=False)
+	best = ctx.Value('d', _INF) #cost of the best goal found so far
+	stop = ctx.Value('b', 0, lock=False)
+	workers = [ctx.Process(target=_worker, args=(i, graph, s, t, heuristic, processes, batch,
+			inboxes, results, sent, received, idle, best, stop), daemon=True) for i in range(processes)]
+	for worker in workers:
+		worker.start()
+	try:
+		last = None
+		while True:
+			time.sleep(0.001)
+			if any(worker.exitcode not in (None, 0) for worker in workers):
+				raise RuntimeError("an HDA* worker died")
+			wave = (tuple(sent), tuple(received))
+			if all(idle) and sum(wave[0]) == sum(wave[1]) and wave == (tuple(sent), tuple(received)):
+				if wave == last: #nothing moved between two quiet waves: done
+					break
+				last = wave
+			else:
+				last = None
+		stop.value = 1
+		parents, counts = {}, SearchStats()
+		for _ in workers:
+			part, expansions, generated, peak = results.get()
+			parents.update(part)
+			counts.expansions += expansions
+			counts.generated += generated
+			counts.frontier(peak)
+	finally:
+		stop.value = 1
+		for worker in workers:
+			worker.join(1)
+			if worker.is_alive():
+				worker.terminate()
+
+	if stats is not None:
+		stats.expansions += counts.expansions
+		stats.generated += counts.generated
+		stats.frontier(counts.peak_frontier)
+	else:
+		_expand.expand_count += counts.expansions
+	if best.value == _INF:
+		print("No solution found")
+		return
+	path = [t]
+	while parents[path[-1]] != -1:
+		path.append(parents[path[-1]]) #retraces path from end to start
+	return graph.path_names(path[::-1])
+
+def _worker(me, graph, s, t, heuristic, processes, batch, inboxes, results, sent, received, idle, best, stop):
+	targets, weights = graph.targets, graph.weights
+	h = heuristic if heuristic is not None else (lambda u, t: 0)
+	stats = SearchStats()
+	gval, parents, open = {}, {}, []
+	outboxes = [[] for _ in range(processes)]
+
+	def integrate(v, g, u):
+		if g < gval.get(v, _INF):
+			gval[v] = g
+			parents[v] = u
+			heapq.heappush(open, (g + h(v, t), g, v))
+
+	def flush(i):
+		sent[me] += 1
+		inboxes[i].put(outboxes[i])
+		outboxes[i] = []
+
+	if owner(s, processes) == me:
+		integrate(s, 0.0, -1)
+	expanded = 0
+	while not stop.value:
+		while True: #take in whatever the other workers have sent
+			try:
+				nodes = inboxes[me].get(block=not open, timeout=0.001)
+			except queue.Empty:
+				break
+			idle[me] = 0
+			for v, g, u in nodes:
+				integrate(v, g, u)
+			received[me] += 1
+		while open and (open[0][1] > gval[open[0][2]] or open[0][0] >= best.value):
+			heapq.heappop(open) #stale, or cannot beat the best goal any more
+		if not open:
+			for i in range(processes):
+				if outboxes[i]:
+					flush(i)
+			idle[me] = 1
+			continue
+		idle[me] = 0
+		f, g, u = heapq.heappop(open)
+		if u == t:
+			with best.get_lock():
+				if g < best.value:
+					best.value = g
+			continue
+		for e in expand_compiled(u, graph, stats):
+			v = targets[e]
+			i = owner(v, processes)
+			if i == me:
+				integrate(v, g + weights[e], u)
+			else:
+				outboxes[i].append((v, g + weights[e], u))
+				if len(outboxes[i]) >= batch:
+					flush(i)
+		stats.frontier(len(open))
+		expanded += 1
+		if expanded % batch == 0: #do not sit on small batches while others starve
+			for i in range(processes):
+				if outboxes[i]:
+					flush(i)
+	results.put((parents, stats.expansions, stats.generated, stats.peak_frontier))
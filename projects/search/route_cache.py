@@ -0,0 +1,104 @@
+from collections import OrderedDict
+import my_search
+
+class RouteCache:
+	"""An LRU cache of (start, end) -> path in front of my_search.a_star_search and
+	breadth_first_search, for one dis_map/time_map pair.
+	Travel-time changes must go through update_edge(), which drops only the cached routes the
+	change can affect instead of flushing the whole cache:
+	- a road that gets slower or is closed invalidates the routes that use it;
+	- a road that gets faster or is opened keeps every route whose start-to-road plus
+	  road-to-end dis_map bound still cannot beat it (dis_map must be admissible for this);
+	- BFS routes only depend on which roads exist, so only closing or opening a road touches them."""
+	def __init__(self, dis_map, time_map, maxsize=1024):
+		self.dis_map = dis_map
+		self.time_map = time_map
+		self._heuristic = my_search._heuristic(dis_map)
+		self.maxsize = maxsize
+		self.hits = 0
+		self.misses = 0
+		self.invalidations = 0
+		self._routes = OrderedDict() #(kind, start, end) -> (path, travel time)
+		self._users = {} #(node, next) -> keys of the cached routes driving that road
+
+	def __len__(self):
+		return len(self._routes)
+
+	def __repr__(self):
+		return "RouteCache(size={}/{}, hits={}, misses={}, invalidations={})".format(
+			len(self._routes), self.maxsize, self.hits, self.misses, self.invalidations)
+
+	def a_star_search(self, start, end):
+		return self._lookup("time", start, end)
+
+	def breadth_first_search(self, start, end):
+		return self._lookup("hops", start, end)
+
+	def clear(self):
+		self._routes.clear()
+		self._users.clear()
+
+	def update_edge(self, node, next, t):
+		"""Set time_map[node][next] = t (None closes the road) and invalidate affected routes."""
+		old = self.time_map[node].get(next)
+		self.time_map[node][next] = t
+		if old == t:
+			return
+		if old is None or (t is not None and t < old):
+			#a faster or new road: routes using it only get cheaper, anything else might now lose to it
+			for key, (path, cost) in list(self._routes.items()):
+				if key in self._users.get((node, next), ()):
+					if t is not None and old is not None:
+						self._routes[key] = (path, cost - old + t)
+				elif key[0] == "time":
+					bound = self._heuristic(key[1], node) + t + self._heuristic(next, key[2])
+					if bound < cost:
+						self._invalidate(key)
+				elif old is None: #a new road can change which route BFS finds first
+					self._invalidate(key)
+		else:
+			#a slower or closed road: only the routes that drive it are affected
+			for key in list(self._users.get((node, next), ())):
+				if key[0] == "time" or t is None:
+					self._invalidate(key)
+
+	def _lookup(self, kind, start, end):
+		key = (kind, start, end)
+		if key in self._routes:
+			self.hits += 1
+			self._routes.move_to_end(key)
+			return self._routes[key][0]
+		self.misses += 1
+		if kind == "time":
+			path = my_search.a_star_search(self.dis_map, self.time_map, start, end)
+		else:
+			path = my_search.breadth_first_search(self.time_map, start, end)
+		self._store(key, path)
+		return path
+
+	def _store(self, key, path):
+		if self.maxsize <= 0:
+			return
+		if path is None:
+			cost = float('inf')
+		else:
+			cost = sum(self.time_map[a][b] for a, b in zip(path, path[1:]))
+			for edge in zip(path, path[1:]):
+				self._users.setdefault(edge, set()).add(key)
+		self._routes[key] = (path, cost)
+		while len(self._routes) > self.maxsize:
+			self._forget(next(iter(self._routes))) #least recently used
+
+	def _invalidate(self, key):
+		self.invalidations += 1
+		self._forget(key)
+
+	def _forget(self, key):
+		path, _ = self._routes.pop(key)
+		if path is not None:
+			for edge in zip(path, path[1:]):
+				users = self._users.get(edge)
+				if users is not None:
+					users.discard(key)
+					if not users:
+						del self._users[edge]
@@ -0,0 +1,192 @@
+"""A local route server: loads one compiled graph and answers route queries over TCP or stdio.
+Run as: python server.py GRAPH [--port 8765 | --stdio] [--processes N]
+GRAPH is a file written by CompiledGraph.save() (.csr), a DIMACS .gr file or an edge list.
+The protocol is one JSON object per line each way. A request is
+	{"id": 1, "start": "Campus", "end": "YWCA", "metric": "time"}
+(metric "time" is a shortest travel-time path, "hops" the breadth_first_search path), and
+the answer carries the same id plus path, cost, expansions, coalesced and timing in ms, or
+an "error" string. Answers on one connection come back as they finish, not in order."""
+import argparse, asyncio, contextlib, io, json, os, sys, time
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import my_search
+from expand import SearchStats
+from graph import CompiledGraph
+import graph_io
+
+class RouteServer:
+	"""Answers route queries against one graph.CompiledGraph from a pool of workers.
+	With processes > 0 searches run in a process pool whose workers each receive the graph
+	once at start-up (a graph loaded with CompiledGraph.load() is shared through its file
+	instead of copied); with processes=0 they run on threads, which is cheaper to start but
+	shares one interpreter. heuristic(u, t) takes node ids and is used for metric "time"; it
+	must be picklable for a process pool. Identical queries that arrive while one is already
+	being searched wait for that search instead of starting another.
+	queries, coalesced and errors count what the server has answered so far."""
+	def __init__(self, graph, heuristic=None, processes=0):
+		self.graph = graph
+		self.heuristic = heuristic
+		if processes > 0:
+			#forkserver (spawn where there is none), not fork: forked workers would inherit the
+			#client sockets and hold them open
+			method = "forkserver" if "forkserver" in mp.get_all_start_methods() else "spawn"
+			self._pool = ProcessPoolExecutor(processes, mp.get_context(method),
+				initializer=_init_worker, initargs=(graph, heuristic))
+			self._search = _pooled_route
+		else:
+			self._pool = ThreadPoolExecutor(max(os.cpu_count() or 1, 1))
+			self._search = lambda metric, start, end: _route(graph, heuristic, metric, start, end)
+		self._inflight = {} #(metric, start, end) -> future of the search running for it
+		self.queries = 0
+		self.coalesced = 0
+		self.errors = 0
+
+	def __repr__(self):
+		return "RouteServer({!r}, queries={}, coalesced={}, errors={})".format(
+			self.graph, self.queries, self.coalesced, self.errors)
+
+	def close(self):
+		self._pool.shutdown(wait=True)
+
+	async def route(self, start, end, metric="time"):
+		"""Answer one query as a dict: path (names, or None if unreachable), cost, expansions,
+		coalesced (True if it rode along with an identical query) and timing with the search
+		time inside the worker and the total time seen by the server, both in ms."""
+		received = time.perf_counter()
+		if metric not in _METRICS:
+			raise ValueError("metric must be 'time' or 'hops', not {!r}".format(metric))
+		for name in (start, end):
+			if name not in self.graph.ids:
+				raise KeyError("unknown landmark {!r}".format(name))
+		key = (metric, start, end)
+		search = self._inflight.get(key)
+		coalesced = search is not None
+		if coalesced:
+			self.coalesced += 1
+		else:
+			loop = asyncio.get_running_loop()
+			search = self._inflight[key] = loop.run_in_executor(self._pool, self._search, metric, start, end)
+			search.add_done_callback(lambda _: self._inflight.pop(key, None))
+		path, cost, expansions, seconds = await asyncio.shield(search)
+		self.queries += 1
+		return {"path": path, "cost": cost, "expansions": expansions, "coalesced": coalesced,
+			"timing": {"search_ms": seconds * 1000, "total_ms": (time.perf_counter() - received) * 1000}}
+
+	async def answer(self, line):
+		"""Decode one request line and return the answer as a JSON line."""
+		request_id = None
+		try:
+			request = json.loads(line)
+			request_id = request.get("id")
+			reply = await self.route(request["start"], request["end"], request.get("metric", "time"))
+		except Exception as error: #every request gets an answer, even if it is an error
+			self.errors += 1
+			reply = {"error": "{}: {}".format(type(error).__name__, error)}
+		reply["id"] = request_id
+		return json.dumps(reply) + "\n"
+
+	async def serve_tcp(self, host="127.0.0.1", port=0):
+		"""Start listening on host:port (port 0 picks a free one) and return the asyncio.Server;
+		server.sockets[0].getsockname() tells which port it got."""
+		return await asyncio.start_server(self._connection, host, port)
+
+	async def serve_stdio(self):
+		"""Read requests from stdin and write answers to stdout until stdin closes."""
+		loop = asyncio.get_running_loop()
+		readline = lambda: loop.run_in_executor(None, sys.stdin.buffer.readline) #works for files and ttys too
+		channel = sys.stdout
+		sys.stdout = sys.stderr #stray prints (e.g. "No solution found") stay off the channel
+		def write(line):
+			channel.write(line)
+			channel.flush()
+		try:
+			await self._serve(readline, write)
+		finally:
+			sys.stdout = channel
+
+	async def _connection(self, reader, writer):
+		try:
+			await self._serve(reader.readline, lambda line: writer.write(line.encode()))
+			await writer.drain()
+		finally:
+			writer.close()
+
+	async def _serve(self, readline, write):
+		pending = set()
+		async def reply(line):
+			write(await self.answer(line))
+		while True:
+			line = await readline()
+			if not line:
+				break
+			if line.strip():
+				task = asyncio.create_task(reply(line))
+				pending.add(task)
+				task.add_done_callback(pending.discard)
+		if pending:
+			await asyncio.gather(*pending)
+
+
+def _route(graph, heuristic, metric, start, end):
+	stats = SearchStats()
+	if metric == "time":
+		path = my_search.a_star_search_compiled(graph, start, end, heuristic, stats=stats)
+	else:
+		path = my_search.breadth_first_search_compiled(graph, start, end, stats=stats)
+	cost = None
+	if path is not None:
+		ids = graph.ids
+		cost = sum(graph.weight(ids[a], ids[b]) for a, b in zip(path, path[1:]))
+	return path, cost, stats.expansions, stats.wall_time
+
+_METRICS = ("time", "hops")
+
+_worker_graph = None
+
+def _init_worker(graph, heuristic):
+	global _worker_graph
+	_worker_graph = (graph, heuristic)
+
+def _pooled_route(metric, start, end):
+	#a worker process may share the server's stdout, which can be the protocol channel
+	graph, heuristic = _worker_graph
+	with contextlib.redirect_stdout(io.StringIO()):
+		return _route(graph, heuristic, metric, start, end)
+
+
+def load_graph(path):
+	"""A CompiledGraph from a saved (.csr), DIMACS (.gr) or edge-list file."""
+	name = path[:-3] if path.endswith(".gz") else path
+	if name.endswith(".csr"):
+		return CompiledGraph.load(path)
+	if name.endswith(".gr"):
+		return graph_io.load_dimacs(path)
+	return graph_io.load_edge_list(path)
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+	parser.add_argument("graph")
+	parser.add_argument("--host", default="127.0.0.1")
+	parser.add_argument("--port", type=int, default=8765)
+	parser.add_argument("--stdio", action="store_true", help="speak the protocol on stdin/stdout instead of TCP")
+	parser.add_argument("--processes", type=int, default=0, help="worker processes (0 = threads)")
+	args = parser.parse_args()
+
+	server = RouteServer(load_graph(args.graph), processes=args.processes)
+	async def run():
+		if args.stdio:
+			await server.serve_stdio()
+			return
+		listening = await server.serve_tcp(args.host, args.port)
+		print("listening on {}:{}".format(*listening.sockets[0].getsockname()[:2]), file=sys.stderr)
+		async with listening:
+			await listening.serve_forever()
+	try:
+		asyncio.run(run())
+	except KeyboardInterrupt:
+		pass
+	finally:
+		server.close()
+
+if __name__ == "__main__":
+	main()